@@ -0,0 +1,313 @@
+import sys
+import os
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+# Benchmark suite for every execution path: throughput (cases/sec) and latency percentiles
+# per unit of work, on both case files and on synthetic trips. Results can be saved as
+# JSON and compared against a saved baseline; any benchmark whose throughput drops by more
+# than --tolerance is reported as a regression and the script exits with status 1.
+#
+#   python benchmark.py                                  # run everything, print a table
+#   python benchmark.py --output bench.json              # ... and save the results
+#   python benchmark.py --baseline bench.json            # ... and compare against a baseline
+#   python benchmark.py --only scalar --sizes 1000 10000000
+
+from tune_parameters import SCRIPT_DIR, PUBLIC_CASES_JSON_PATH, DEFAULT_PARAMS, \
+    parse_test_cases, evaluate_parameters, sample_random_parameters, random_search_parameters
+from calculate_reimbursement import calculate_reimbursement, calculate_reimbursement_batch, COMPILED_DEFAULT_PARAMS
+
+PRIVATE_CASES_JSON_PATH = os.path.join(SCRIPT_DIR, "private_cases.json")
+RUN_SH_PATH = os.path.join(SCRIPT_DIR, "run.sh")
+
+DEFAULT_SYNTHETIC_SIZES = (1000, 10000, 100000)
+DEFAULT_RUN_SH_CALLS = 20
+DEFAULT_EVALUATION_TRIALS = 50
+DEFAULT_SEARCH_TRIALS = 2000
+DEFAULT_TOLERANCE = 0.2 # Allowed fractional drop in cases/sec before a regression is flagged
+LOAD_REPEATS = 5
+LATENCY_SAMPLE_LIMIT = 100000 # Scalar calls timed individually for the latency percentiles
+SYNTHETIC_BLOCK_SIZE = 100000 # Synthetic trips are generated and timed in blocks of this many
+MAX_SYNTHETIC_JSON_TRIPS = 1000000 # Larger synthetic JSON files are not written (about 150 bytes per trip)
+SEED = 12345
+
+def percentiles(samples):
+    """p50/p90/p99/max of latency samples in seconds, as milliseconds (nearest-rank)."""
+    ordered = sorted(samples)
+    def rank(fraction):
+        return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))] * 1000.0
+    return {"p50_ms": rank(0.50), "p90_ms": rank(0.90), "p99_ms": rank(0.99), "max_ms": ordered[-1] * 1000.0}
+
+def make_result(cases, seconds, latencies, unit, **extra):
+    """One benchmark's record: throughput over the timed work plus latency percentiles per unit."""
+    result = {
+        "cases": cases,
+        "seconds": seconds,
+        "cases_per_sec": cases / seconds if seconds > 0 else float("inf"),
+        "unit": unit,
+    }
+    result.update(percentiles(latencies))
+    result.update(extra)
+    return result
+
+def synthetic_trips(count, rng):
+    """count random trips spanning the case files' ranges, with the same two-decimal precision."""
+    return [(rng.randint(1, 14), round(rng.uniform(5, 1300), 2), round(rng.uniform(1, 2500), 2)) for _ in range(count)]
+
+def iter_synthetic_blocks(size, seed=SEED):
+    rng = random.Random(seed)
+    for start in range(0, size, SYNTHETIC_BLOCK_SIZE):
+        yield synthetic_trips(min(SYNTHETIC_BLOCK_SIZE, size - start), rng)
+
+def case_file_trips(json_path):
+    with open(json_path, "r") as f:
+        cases = json.load(f)
+    trips = []
+    for case in cases:
+        fields = case.get("input", case)
+        trips.append((int(fields["trip_duration_days"]), float(fields["miles_traveled"]), float(fields["total_receipts_amount"])))
+    return trips
+
+# --- Benchmarks ---
+
+def bench_scalar(trip_blocks):
+    """calculate_reimbursement one call at a time: a tight loop for throughput, then timed calls for latency."""
+    params = COMPILED_DEFAULT_PARAMS
+    cases = 0
+    seconds = 0.0
+    latencies = []
+    clock = time.perf_counter
+    for trips in trip_blocks:
+        start = clock()
+        for days, miles, receipts in trips:
+            calculate_reimbursement(days, miles, receipts, params)
+        seconds += clock() - start
+        cases += len(trips)
+        for days, miles, receipts in trips[:max(0, LATENCY_SAMPLE_LIMIT - len(latencies))]:
+            call_start = clock()
+            calculate_reimbursement(days, miles, receipts, params)
+            latencies.append(clock() - call_start)
+    return make_result(cases, seconds, latencies, "call")
+
+def bench_batch(trip_blocks):
+    """calculate_reimbursement_batch over NumPy arrays, one call per block of trips."""
+    import numpy as np
+    cases = 0
+    latencies = []
+    for trips in trip_blocks:
+        days, miles, receipts = (np.array(column, dtype=np.float64) for column in zip(*trips))
+        start = time.perf_counter()
+        calculate_reimbursement_batch(days, miles, receipts)
+        latencies.append(time.perf_counter() - start)
+        cases += len(trips)
+    return make_result(cases, sum(latencies), latencies, f"block of up to {SYNTHETIC_BLOCK_SIZE} trips")
+
+def bench_run_sh(trips, calls):
+    """./run.sh process per call, as eval.sh runs it (uses the resident server if one is listening)."""
+    latencies = []
+    for days, miles, receipts in trips[:calls]:
+        start = time.perf_counter()
+        subprocess.run([RUN_SH_PATH, str(days), str(miles), str(receipts)], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start)
+    return make_result(len(latencies), sum(latencies), latencies, "process")
+
+def bench_evaluate_parameters(test_cases, trials):
+    """tune_parameters.evaluate_parameters, one random candidate per trial."""
+    rng_state = random.getstate()
+    random.seed(SEED)
+    candidates = [sample_random_parameters(DEFAULT_PARAMS) for _ in range(trials)]
+    random.setstate(rng_state)
+    evaluate_parameters(candidates[0], test_cases) # Warm-up: builds the evaluator / worker pool
+    latencies = []
+    for candidate in candidates:
+        start = time.perf_counter()
+        evaluate_parameters(candidate, test_cases)
+        latencies.append(time.perf_counter() - start)
+    num_cases = len(parse_test_cases(test_cases))
+    return make_result(num_cases * trials, sum(latencies), latencies, "trial",
+                       trials_per_sec=trials / sum(latencies))
+
+def bench_random_search(test_cases, trials):
+    """random_search_parameters end to end (its per-trial output is discarded)."""
+    rng_state = random.getstate()
+    random.seed(SEED)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        random_search_parameters(trials, test_cases, DEFAULT_PARAMS)
+    seconds = time.perf_counter() - start
+    random.setstate(rng_state)
+    num_cases = len(parse_test_cases(test_cases))
+    return make_result(num_cases * trials, seconds, [seconds / trials], "trial (mean)",
+                       trials_per_sec=trials / seconds)
+
+def bench_json_load(json_path):
+    """json.load of a whole case file."""
+    latencies = []
+    for _ in range(LOAD_REPEATS):
+        start = time.perf_counter()
+        with open(json_path, "r") as f:
+            num_cases = len(json.load(f))
+        latencies.append(time.perf_counter() - start)
+    return make_result(num_cases * LOAD_REPEATS, sum(latencies), latencies, "load")
+
+def bench_case_store_load(json_path, temp_dir):
+    """Opening a binary case store (mmap + checksum) and reading every row, after converting json_path once."""
+    from case_store import CaseStore, convert_cases
+    store_path = convert_cases(json_path, os.path.join(temp_dir, os.path.basename(json_path) + ".bin"))
+    latencies = []
+    for _ in range(LOAD_REPEATS):
+        start = time.perf_counter()
+        with CaseStore(store_path) as store:
+            num_cases = sum(1 for _ in store)
+        latencies.append(time.perf_counter() - start)
+    return make_result(num_cases * LOAD_REPEATS, sum(latencies), latencies, "load")
+
+def write_synthetic_cases(size, path):
+    """Writes size synthetic trips as public-format cases (expected output from the current model)."""
+    with open(path, "w") as f:
+        f.write("[")
+        first = True
+        for trips in iter_synthetic_blocks(size):
+            for days, miles, receipts in trips:
+                f.write(("" if first else ",") + json.dumps({
+                    "input": {"trip_duration_days": days, "miles_traveled": miles, "total_receipts_amount": receipts},
+                    "expected_output": round(calculate_reimbursement(days, miles, receipts), 2),
+                }))
+                first = False
+        f.write("]")
+
+def collect_benchmarks(args, temp_dir):
+    """(name, zero-argument function) for every selected benchmark, in run order."""
+    benchmarks = []
+    try:
+        import numpy # noqa: F401 -- only checks availability
+        has_numpy = True
+    except ImportError:
+        has_numpy = False
+
+    for label, json_path in (("public_cases", PUBLIC_CASES_JSON_PATH), ("private_cases", PRIVATE_CASES_JSON_PATH)):
+        if not os.path.exists(json_path):
+            continue
+        benchmarks.append((f"json_load/{label}", lambda json_path=json_path: bench_json_load(json_path)))
+        benchmarks.append((f"case_store_load/{label}", lambda json_path=json_path: bench_case_store_load(json_path, temp_dir)))
+        benchmarks.append((f"scalar/{label}", lambda json_path=json_path: bench_scalar([case_file_trips(json_path)])))
+        if has_numpy:
+            benchmarks.append((f"batch/{label}", lambda json_path=json_path: bench_batch([case_file_trips(json_path)])))
+        benchmarks.append((f"run_sh/{label}", lambda json_path=json_path: bench_run_sh(case_file_trips(json_path), args.run_sh_calls)))
+
+    if os.path.exists(PUBLIC_CASES_JSON_PATH):
+        def load_public_cases():
+            with open(PUBLIC_CASES_JSON_PATH, "r") as f:
+                return json.load(f)
+        benchmarks.append(("evaluate_parameters/public_cases",
+                           lambda: bench_evaluate_parameters(load_public_cases(), args.trials)))
+        benchmarks.append(("random_search/public_cases",
+                           lambda: bench_random_search(load_public_cases(), args.search_trials)))
+
+    for size in args.sizes:
+        benchmarks.append((f"scalar/synthetic_{size}", lambda size=size: bench_scalar(iter_synthetic_blocks(size))))
+        if has_numpy:
+            benchmarks.append((f"batch/synthetic_{size}", lambda size=size: bench_batch(iter_synthetic_blocks(size))))
+        if size <= MAX_SYNTHETIC_JSON_TRIPS:
+            def json_load_synthetic(size=size):
+                path = os.path.join(temp_dir, f"synthetic_{size}.json")
+                if not os.path.exists(path):
+                    write_synthetic_cases(size, path)
+                return bench_json_load(path)
+            benchmarks.append((f"json_load/synthetic_{size}", json_load_synthetic))
+
+    if args.only:
+        benchmarks = [(name, fn) for name, fn in benchmarks if any(pattern in name for pattern in args.only)]
+    return benchmarks
+
+def environment_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Names and details of benchmarks whose cases/sec fell more than tolerance below the baseline."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("cases_per_sec"):
+            continue
+        ratio = result["cases_per_sec"] / previous["cases_per_sec"]
+        if ratio < 1.0 - tolerance:
+            regressions.append(f"{name}: {result['cases_per_sec']:,.0f} cases/sec vs baseline "
+                               f"{previous['cases_per_sec']:,.0f} ({(1.0 - ratio) * 100:.1f}% slower)")
+    return regressions
+
+def print_table(results, baseline=None):
+    print(f"{'benchmark':<36} {'cases/sec':>14} {'p50 ms':>10} {'p99 ms':>10}  {'vs baseline':>11}  unit")
+    for name, result in results.items():
+        change = ""
+        if baseline and baseline.get(name, {}).get("cases_per_sec"):
+            change = f"{(result['cases_per_sec'] / baseline[name]['cases_per_sec'] - 1.0) * 100:+.1f}%"
+        print(f"{name:<36} {result['cases_per_sec']:>14,.0f} {result['p50_ms']:>10.4f} {result['p99_ms']:>10.4f}  {change:>11}  {result['unit']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and latency benchmarks for every execution path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SYNTHETIC_SIZES),
+                        help="Synthetic input sizes in trips (e.g. 1000 10000000)")
+    parser.add_argument("--only", nargs="+", help="Run only benchmarks whose name contains one of these strings")
+    parser.add_argument("--run-sh-calls", type=int, default=DEFAULT_RUN_SH_CALLS, help="./run.sh processes per case file")
+    parser.add_argument("--trials", type=int, default=DEFAULT_EVALUATION_TRIALS, help="evaluate_parameters trials")
+    parser.add_argument("--search-trials", type=int, default=DEFAULT_SEARCH_TRIALS, help="random_search_parameters trials")
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Fractional cases/sec drop flagged as a regression (default 0.2)")
+    args = parser.parse_args()
+    if any(size <= 0 for size in args.sizes) or args.run_sh_calls <= 0 or args.trials <= 0 or args.search_trials <= 0:
+        parser.error("sizes, --run-sh-calls, --trials and --search-trials must be positive")
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: Could not read baseline {args.baseline}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as temp_dir:
+        for name, benchmark in collect_benchmarks(args, temp_dir):
+            print(f"Running {name}...", file=sys.stderr)
+            try:
+                results[name] = benchmark()
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"  skipped: {e}", file=sys.stderr)
+
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved results to {args.output}")
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions (more than {args.tolerance * 100:.0f}% slower than {args.baseline}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}.")
@@ -0,0 +1,259 @@
+import sys
+import os
+import json
+import argparse
+import importlib.util
+from decimal import Decimal, ROUND_DOWN
+
+# In-process replacement for eval.sh: imports the calculation function once and scores
+# every case directly instead of spawning ./run.sh, python3 and bc per case. Numbers are
+# computed with Decimal arithmetic and printed with bc's formatting so the report matches
+# what eval.sh prints for the same implementation.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULE_PATH = os.path.join(SCRIPT_DIR, "strategy1_interview_driven", "calculate_reimbursement.py")
+DEFAULT_FUNCTION_NAME = "calculate_reimbursement"
+PUBLIC_CASES_JSON_PATH = os.path.join(SCRIPT_DIR, "public_cases.json")
+
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "strategy1_interview_driven"))
+try:
+    from case_store import open_store
+except ImportError:
+    open_store = None # Evaluating an implementation tree without case_store.py; read JSON only
+finally:
+    sys.path.pop(0)
+
+EXACT_MATCH_THRESHOLD = Decimal("0.01")
+CLOSE_MATCH_THRESHOLD = Decimal("1.0")
+DEFAULT_TOP_N = 5
+
+def load_calculation_function(module_path=DEFAULT_MODULE_PATH, function_name=DEFAULT_FUNCTION_NAME):
+    """Imports function_name from the Python file at module_path.
+
+    The function must follow calculate_reimbursement's signature:
+    (trip_duration_days, miles_traveled, total_receipts_amount) -> amount.
+    """
+    module_dir = os.path.dirname(os.path.abspath(module_path))
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir) # Let the module import its own siblings
+    module_name = os.path.splitext(os.path.basename(module_path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot import {module_path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    try:
+        return getattr(module, function_name)
+    except AttributeError:
+        raise ImportError(f"'{function_name}' not found in {module_path}") from None
+
+def _decimal_from_hundredths(value):
+    """A case store integer (hundredths) as the Decimal jq would print: 9063 -> 90.63, 9060 -> 90.6, 9000 -> 90."""
+    if value % 100 == 0:
+        return Decimal(value // 100)
+    return Decimal(value).scaleb(-2).normalize()
+
+def _cases_from_store(store):
+    return [{
+        "input": {
+            "trip_duration_days": days,
+            "miles_traveled": _decimal_from_hundredths(miles),
+            "total_receipts_amount": _decimal_from_hundredths(receipts),
+        },
+        "expected_output": _decimal_from_hundredths(expected),
+    } for days, miles, receipts, expected in zip(store.days, store.miles_hundredths, store.receipts_cents, store.expected_cents)]
+
+def load_cases(json_path):
+    """Loads cases keeping every number as the exact decimal written in the file (as jq hands them to bc).
+
+    Reads the file's binary case store instead (see case_store.py) when a fresh one exists.
+    """
+    if open_store is not None:
+        store = open_store(json_path)
+        if store is not None and store.has_expected:
+            with store:
+                return _cases_from_store(store)
+        if store is not None:
+            store.close()
+    with open(json_path, 'r') as f:
+        return json.load(f, parse_float=Decimal)
+
+def _bc_divide(numerator, denominator, scale):
+    """bc division: truncated (not rounded) to scale fractional digits."""
+    return (Decimal(numerator) / Decimal(denominator)).quantize(Decimal(1).scaleb(-scale), rounding=ROUND_DOWN)
+
+def bc_format(value):
+    """Formats a Decimal the way bc prints it: no leading zero before the point, bare 0 for zero."""
+    if value == 0:
+        return "0"
+    text = f"{value:f}"
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    return text
+
+def evaluate_cases(cases, calculate, top_n=DEFAULT_TOP_N):
+    """Scores calculate() against public-format cases and returns eval.sh's metrics as a dict."""
+    successful_runs = 0
+    exact_matches = 0
+    close_matches = 0
+    total_error = Decimal(0)
+    max_error = Decimal(0)
+    max_error_case = ""
+    results = []
+    errors = []
+
+    for i, case in enumerate(cases):
+        input_data = case['input']
+        trip_duration = input_data['trip_duration_days']
+        miles_traveled = input_data['miles_traveled']
+        receipts_amount = input_data['total_receipts_amount']
+        expected = Decimal(case['expected_output'])
+
+        # Same conversions run.sh's CLI applies to its argv
+        try:
+            reimbursement = calculate(int(trip_duration), float(miles_traveled), float(receipts_amount))
+            output = f"{reimbursement:.2f}"
+        except Exception as e:
+            errors.append(f"Case {i+1}: Script failed with error: {e}")
+            continue
+        try:
+            actual = Decimal(output)
+            if not actual.is_finite():
+                raise ValueError(output)
+        except (ArithmeticError, ValueError):
+            errors.append(f"Case {i+1}: Invalid output format: {output}")
+            continue
+
+        error = abs(actual - expected)
+        results.append({
+            "case_num": i + 1,
+            "trip_duration_days": trip_duration,
+            "miles_traveled": miles_traveled,
+            "total_receipts_amount": receipts_amount,
+            "expected": expected,
+            "actual": actual,
+            "error": error,
+        })
+        successful_runs += 1
+
+        if error < EXACT_MATCH_THRESHOLD:
+            exact_matches += 1
+        if error < CLOSE_MATCH_THRESHOLD:
+            close_matches += 1
+        total_error += error
+        if error > max_error:
+            max_error = error
+            max_error_case = f"Case {i+1}: {trip_duration} days, {miles_traveled} miles, ${receipts_amount} receipts"
+
+    metrics = {
+        "num_cases": len(cases),
+        "successful_runs": successful_runs,
+        "exact_matches": exact_matches,
+        "close_matches": close_matches,
+        "total_error": total_error,
+        "max_error": max_error,
+        "max_error_case": max_error_case,
+        "errors": errors,
+    }
+    if successful_runs == 0:
+        metrics.update(average_error=None, exact_pct=None, close_pct=None, score=None, worst_cases=[])
+        return metrics
+
+    average_error = _bc_divide(total_error, successful_runs, 2)
+    # bc keeps the operand scales: avg_error * 100 keeps avg_error's (0 once printed as "0"),
+    # (n - exact) * 0.1 has one digit
+    score_scale = 2 if average_error != 0 else 1
+    score = average_error * 100 + (len(cases) - exact_matches) * Decimal("0.1")
+    # eval.sh sorts "case:expected:actual:error:..." lines with sort -t: -k4 -nr, so ties fall back to the whole line
+    results.sort(key=lambda r: (r["error"], f"{r['case_num']}:{r['expected']}"), reverse=True)
+    metrics.update(
+        average_error=average_error,
+        exact_pct=_bc_divide(exact_matches * 100, successful_runs, 1),
+        close_pct=_bc_divide(close_matches * 100, successful_runs, 1),
+        score=score.quantize(Decimal(1).scaleb(-score_scale)),
+        worst_cases=results[:top_n],
+    )
+    return metrics
+
+def print_report(metrics):
+    """Prints the results section of eval.sh for the given metrics."""
+    num_cases = metrics["num_cases"]
+    exact_matches = metrics["exact_matches"]
+    if metrics["successful_runs"] == 0:
+        print("❌ No successful test cases!")
+        print("")
+        print("Your script either:")
+        print("  - Failed to run properly")
+        print("  - Produced invalid output format")
+        print("  - Timed out on all cases")
+        print("")
+        print("Check the errors below for details.")
+    else:
+        print("✅ Evaluation Complete!")
+        print("")
+        print("📈 Results Summary:")
+        print(f"  Total test cases: {num_cases}")
+        print(f"  Successful runs: {metrics['successful_runs']}")
+        print(f"  Exact matches (±$0.01): {exact_matches} ({bc_format(metrics['exact_pct'])}%)")
+        print(f"  Close matches (±$1.00): {metrics['close_matches']} ({bc_format(metrics['close_pct'])}%)")
+        print(f"  Average error: ${bc_format(metrics['average_error'])}")
+        print(f"  Maximum error: ${bc_format(metrics['max_error'])}")
+        if metrics["max_error_case"]:
+            print(f"  Maximum error case: {metrics['max_error_case']}")
+        print("")
+        print(f"🎯 Your Score: {bc_format(metrics['score'])} (lower is better)")
+        print("")
+
+        if exact_matches == num_cases:
+            print("🏆 PERFECT SCORE! You have reverse-engineered the system completely!")
+        elif exact_matches > 950:
+            print("🥇 Excellent! You are very close to the perfect solution.")
+        elif exact_matches > 800:
+            print("🥈 Great work! You have captured most of the system behavior.")
+        elif exact_matches > 500:
+            print("🥉 Good progress! You understand some key patterns.")
+        else:
+            print("📚 Keep analyzing the patterns in the interviews and test cases.")
+
+        print("")
+        print("💡 Tips for improvement:")
+        if exact_matches < num_cases:
+            print("  Check these high-error cases:")
+            for result in metrics["worst_cases"]:
+                print(f"    Case {result['case_num']}: {result['trip_duration_days']} days, {result['miles_traveled']} miles, ${result['total_receipts_amount']} receipts")
+                print(f"      Expected: ${float(result['expected']):.2f}, Got: ${float(result['actual']):.2f}, Error: ${float(result['error']):.2f}")
+
+    errors = metrics["errors"]
+    if errors:
+        print()
+        print("⚠️  Errors encountered:")
+        for error_line in errors[:10]:
+            print(f"  {error_line}")
+        if len(errors) > 10:
+            print(f"  ... and {len(errors) - 10} more errors")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a reimbursement implementation in-process (same metrics as eval.sh).")
+    parser.add_argument("--cases", default=PUBLIC_CASES_JSON_PATH, help="Cases file in public_cases.json format")
+    parser.add_argument("--module", default=DEFAULT_MODULE_PATH, help="Python file defining the calculation function")
+    parser.add_argument("--function", default=DEFAULT_FUNCTION_NAME, help="Name of the calculation function in --module")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_N, help="Number of highest-error cases to list")
+    args = parser.parse_args()
+
+    try:
+        calculate_fn = load_calculation_function(args.module, args.function)
+    except (ImportError, OSError) as e:
+        print(f"Error: Could not load '{args.function}' from {args.module}: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        test_cases = load_cases(args.cases)
+    except FileNotFoundError:
+        print(f"Error: Test cases file not found at {args.cases}", file=sys.stderr)
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"Error: Could not decode JSON from {args.cases}", file=sys.stderr)
+        sys.exit(1)
+
+    print_report(evaluate_cases(test_cases, calculate_fn, top_n=args.top))
@@ -0,0 +1,213 @@
+import sys
+import random
+from copy import deepcopy
+
+# Closed-form rate fitting. Once the thresholds, the receipt cap and the short-trip multiplier
+# are fixed, calculate_reimbursement is linear in every rate and bonus amount:
+#
+#   total = m * (days * per_diem_rate
+#                + mileage tier lengths . (mileage_t1_rate, mileage_t2_rate, mileage_t3_rate)
+#                + min(receipt tier lengths . (receipt_t1_rate, ...), cap)
+#                + [days == 5] * five_day_trip_bonus_amount
+#                + [miles/day > threshold] * mileage_efficiency_bonus_amount)
+#
+# with m = low_reimbursement_multiplier for short low-mileage trips and 1 otherwise. So instead
+# of sampling all of PARAMETER_RANGES blindly, fit_search only searches the nonlinear
+# parameters and solves the linear ones exactly for each candidate, by least squares or by
+# least absolute deviations (which targets the average absolute error eval.sh reports).
+# The receipt cap is handled by re-solving with the capped trips' receipt term held at the
+# cap until the capped set stops changing. Requires NumPy.
+
+from tune_parameters import PARAMETER_RANGES, parse_test_cases
+from calculate_reimbursement import calculate_reimbursement_batch, compile_params, round_receipts_amount
+
+LINEAR_PARAMETERS = (
+    "per_diem_rate",
+    "mileage_t1_rate", "mileage_t2_rate", "mileage_t3_rate",
+    "receipt_t1_rate", "receipt_t2_rate", "receipt_t3_rate",
+    "five_day_trip_bonus_amount",
+    "mileage_efficiency_bonus_amount",
+)
+
+# Searched parameters [min, max, type], as in PARAMETER_RANGES. The receipt cap has no entry
+# there (it was set by hand), so its search range is defined here.
+SEARCH_PARAMETER_RANGES = {
+    name: PARAMETER_RANGES[name] for name in (
+        "mileage_t1_threshold_miles", "mileage_t2_threshold_miles",
+        "receipt_t1_threshold_amount", "receipt_t2_threshold_amount",
+        "mileage_efficiency_threshold_miles_per_day",
+        "short_trip_day_threshold", "low_mileage_threshold_miles",
+        "low_reimbursement_multiplier",
+    )
+}
+SEARCH_PARAMETER_RANGES["receipt_reimbursement_cap_amount"] = [300.0, 2000.0, 'float']
+
+FIT_OBJECTIVES = ("l1", "l2")
+MAX_CAP_ITERATIONS = 10 # Re-solves while the set of capped trips keeps changing
+L1_IRLS_ITERATIONS = 30 # Iteratively reweighted least squares rounds for the L1 fit
+L1_IRLS_EPSILON = 1e-6 # Floor on |residual| in the IRLS weights
+REFINE_INITIAL_STEP_FRACTION = 0.1 # First coordinate-search step, as a fraction of each range
+REFINE_MIN_STEP_FRACTION = 1e-3 # Coordinate search stops once steps shrink below this fraction
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        print("Error: the fit mode requires NumPy (pip install numpy).", file=sys.stderr)
+        raise
+    return np
+
+class FitCases:
+    """Case data as NumPy arrays, with the parameter-free receipt rounding applied once."""
+
+    def __init__(self, test_cases):
+        np = _import_numpy()
+        parsed_cases = parse_test_cases(test_cases)
+        self.days = np.array([case[0] for case in parsed_cases], dtype=np.float64)
+        self.miles = np.array([case[1] for case in parsed_cases], dtype=np.float64)
+        self.receipts = np.array([case[2] for case in parsed_cases], dtype=np.float64)
+        self.rounded_receipts = np.array([round_receipts_amount(case[2]) for case in parsed_cases], dtype=np.float64)
+        self.expected = np.array([case[3] for case in parsed_cases], dtype=np.float64)
+
+def _tier_lengths(np, amount, t1_threshold, t2_threshold):
+    """Coefficients of (t1_rate, t2_rate, t3_rate) in the 3-tier schedule, branch for branch."""
+    positive = amount > 0
+    in_t1 = positive & (amount <= t1_threshold)
+    in_t2 = positive & (amount > t1_threshold) & (amount <= t2_threshold)
+    in_t3 = positive & ~in_t1 & ~in_t2
+    return np.stack([
+        np.where(in_t1, amount, np.where(in_t2 | in_t3, t1_threshold, 0.0)),
+        np.where(in_t2, amount - t1_threshold, np.where(in_t3, t2_threshold - t1_threshold, 0.0)),
+        np.where(in_t3, amount - t2_threshold, 0.0),
+    ], axis=1)
+
+def _solve(np, design, target, objective):
+    """Least-squares or least-absolute-deviation solution of design @ x ~= target."""
+    solution = np.linalg.lstsq(design, target, rcond=None)[0]
+    if objective == "l1":
+        for _ in range(L1_IRLS_ITERATIONS):
+            weights = np.sqrt(1.0 / np.maximum(np.abs(design @ solution - target), L1_IRLS_EPSILON))
+            solution = np.linalg.lstsq(design * weights[:, None], target * weights, rcond=None)[0]
+    return solution
+
+def fit_linear_parameters(fit_cases, nonlinear_params, objective="l1"):
+    """Solves the rates and bonus amounts for fixed nonlinear parameters.
+
+    Returns a dict with LINEAR_PARAMETERS as keys.
+    """
+    np = _import_numpy()
+    p = nonlinear_params
+    days, miles, expected = fit_cases.days, fit_cases.miles, fit_cases.expected
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        efficient = (days > 0) & (miles / days > p["mileage_efficiency_threshold_miles_per_day"])
+    multiplier = np.where((days <= p["short_trip_day_threshold"]) & (miles <= p["low_mileage_threshold_miles"]),
+                          p["low_reimbursement_multiplier"], 1.0)
+    receipt_lengths = _tier_lengths(np, fit_cases.rounded_receipts,
+                                    p["receipt_t1_threshold_amount"], p["receipt_t2_threshold_amount"])
+    design = np.column_stack([
+        days,
+        _tier_lengths(np, miles, p["mileage_t1_threshold_miles"], p["mileage_t2_threshold_miles"]),
+        receipt_lengths,
+        (days == 5).astype(np.float64),
+        efficient.astype(np.float64),
+    ]) * multiplier[:, None]
+    receipt_columns = slice(4, 7)
+    cap = p["receipt_reimbursement_cap_amount"]
+
+    capped = np.zeros(len(expected), dtype=bool)
+    for _ in range(MAX_CAP_ITERATIONS):
+        # Capped trips get the cap as a constant instead of their receipt tier terms
+        capped_design = design.copy()
+        capped_design[capped, receipt_columns] = 0.0
+        target = expected - np.where(capped, cap * multiplier, 0.0)
+        solution = _solve(np, capped_design, target, objective)
+        now_capped = receipt_lengths @ solution[receipt_columns] > cap
+        if np.array_equal(now_capped, capped):
+            break
+        capped = now_capped
+    return {name: float(value) for name, value in zip(LINEAR_PARAMETERS, solution)}
+
+def average_error(fit_cases, params):
+    """Average absolute error of params under the exact model (calculate_reimbursement_batch)."""
+    np = _import_numpy()
+    calculated = calculate_reimbursement_batch(fit_cases.days, fit_cases.miles, fit_cases.receipts, params)
+    return float(np.mean(np.abs(calculated - fit_cases.expected)))
+
+def fit_candidate(fit_cases, base_params, nonlinear_params, objective="l1"):
+    """Returns (params, average_error) with the linear parameters fitted for nonlinear_params."""
+    params = deepcopy(base_params)
+    params.update(nonlinear_params)
+    params.update(fit_linear_parameters(fit_cases, params, objective))
+    try:
+        compile_params(params)
+    except ValueError:
+        return params, float('inf') # Singular fits can produce non-finite rates
+    return params, average_error(fit_cases, params)
+
+def _sample_nonlinear_parameters():
+    sampled = {}
+    for param_name, (min_val, max_val, param_type) in SEARCH_PARAMETER_RANGES.items():
+        if param_type == 'int':
+            sampled[param_name] = random.randint(min_val, max_val)
+        else:
+            sampled[param_name] = random.uniform(min_val, max_val)
+    return sampled
+
+def _refine(fit_cases, base_params, best_nonlinear, best_params, best_error, objective):
+    """Bounded coordinate search over the nonlinear parameters, halving steps when stuck."""
+    step_fraction = REFINE_INITIAL_STEP_FRACTION
+    while step_fraction >= REFINE_MIN_STEP_FRACTION:
+        improved = False
+        for param_name, (min_val, max_val, param_type) in SEARCH_PARAMETER_RANGES.items():
+            step = (max_val - min_val) * step_fraction
+            if param_type == 'int':
+                step = max(1, round(step))
+            for direction in (1, -1):
+                value = min(max(best_nonlinear[param_name] + direction * step, min_val), max_val)
+                if value == best_nonlinear[param_name]:
+                    continue
+                candidate = dict(best_nonlinear, **{param_name: value})
+                params, error = fit_candidate(fit_cases, base_params, candidate, objective)
+                if error < best_error:
+                    best_nonlinear, best_params, best_error = candidate, params, error
+                    improved = True
+                    print(f"  Refine {param_name} = {value:.4f}: Average Error {best_error:.4f}")
+                    break
+        if not improved:
+            step_fraction /= 2
+    return best_nonlinear, best_params, best_error
+
+def fit_search(num_samples, test_cases, base_params, objective="l1"):
+    """Samples the nonlinear parameters, fits the linear ones exactly for each, then refines the best."""
+    if objective not in FIT_OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}'. Expected one of: {', '.join(FIT_OBJECTIVES)}")
+    print(f"--- Closed-Form Fit Initialized ---")
+    print(f"Searching {len(SEARCH_PARAMETER_RANGES)} nonlinear parameters over {num_samples} samples; "
+          f"solving {len(LINEAR_PARAMETERS)} linear parameters by {objective.upper()} per sample.\n")
+
+    fit_cases = FitCases(test_cases)
+    best_nonlinear = {name: base_params[name] for name in SEARCH_PARAMETER_RANGES}
+    best_params, best_error = fit_candidate(fit_cases, base_params, best_nonlinear, objective)
+    print(f"Base thresholds with fitted rates: Average Error {best_error:.4f}")
+
+    for i in range(num_samples):
+        candidate = _sample_nonlinear_parameters()
+        params, error = fit_candidate(fit_cases, base_params, candidate, objective)
+        if error < best_error:
+            best_nonlinear, best_params, best_error = candidate, params, error
+            print(f"Sample {i+1}/{num_samples}: ** New best error found: {best_error:.4f} **")
+
+    print("\nRefining best candidate...")
+    best_nonlinear, best_params, best_error = _refine(fit_cases, base_params, best_nonlinear, best_params, best_error, objective)
+
+    print(f"\n--- Closed-Form Fit Complete ---")
+    print(f"Best parameters found with Average Error: {best_error:.4f}")
+    print("Best parameter set:")
+    for key, value in best_params.items():
+        if isinstance(value, float):
+            print(f"  '{key}': {value:.4f}")
+        else:
+            print(f"  '{key}': {value}")
+    print("-------------------------------------")
+    return best_params, best_error
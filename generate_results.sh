@@ -58,32 +58,51 @@ rm -f private_results.txt
 
 echo "Processing $total_cases test cases..." >&2
 
-# Process each test case
-for ((i=0; i<total_cases; i++)); do
-    if [ $((i % 100)) -eq 0 ] && [ $i -gt 0 ]; then
-        echo "Progress: $i/$total_cases cases processed..." >&2
+# Fast path: if run.sh supports batch mode, stream every case through a single process.
+# The output is only kept if it has one valid line per case; otherwise fall back to one call per case.
+batch_ok=false
+if ./run.sh --batch private_cases.json > private_results.txt 2>/dev/null; then
+    batch_lines=$(wc -l < private_results.txt | tr -d '[:space:]')
+    invalid_lines=$(grep -cvE '^(-?[0-9]+\.?[0-9]*|ERROR)$' private_results.txt || true)
+    if [ "$batch_lines" -eq "$total_cases" ] && [ "$invalid_lines" -eq 0 ]; then
+        batch_ok=true
+        echo "Processed $total_cases cases in batch mode." >&2
+        error_lines=$(grep -c '^ERROR$' private_results.txt || true)
+        if [ "$error_lines" -gt 0 ]; then
+            echo "Warning: $error_lines cases produced ERROR (rerun ./run.sh --batch private_cases.json for details)" >&2
+        fi
     fi
-    
-    # Extract test case data from pre-loaded array
-    IFS=':' read -r trip_duration miles_traveled receipts_amount <<< "${test_cases[i]}"
-    
-    # Run the user's implementation
-    if script_output=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>/dev/null); then
-        # Check if output is a valid number
-        output=$(echo "$script_output" | tr -d '[:space:]')
-        if [[ $output =~ ^-?[0-9]+\.?[0-9]*$ ]]; then
-            echo "$output" >> private_results.txt
+fi
+if [ "$batch_ok" != true ]; then
+    rm -f private_results.txt
+
+    # Process each test case
+    for ((i=0; i<total_cases; i++)); do
+        if [ $((i % 100)) -eq 0 ] && [ $i -gt 0 ]; then
+            echo "Progress: $i/$total_cases cases processed..." >&2
+        fi
+
+        # Extract test case data from pre-loaded array
+        IFS=':' read -r trip_duration miles_traveled receipts_amount <<< "${test_cases[i]}"
+
+        # Run the user's implementation
+        if script_output=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>/dev/null); then
+            # Check if output is a valid number
+            output=$(echo "$script_output" | tr -d '[:space:]')
+            if [[ $output =~ ^-?[0-9]+\.?[0-9]*$ ]]; then
+                echo "$output" >> private_results.txt
+            else
+                echo "Error on case $((i+1)): Invalid output format: $output" >&2
+                echo "ERROR" >> private_results.txt
+            fi
         else
-            echo "Error on case $((i+1)): Invalid output format: $output" >&2
+            # Capture stderr for error reporting
+            error_msg=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>&1 >/dev/null | tr -d '\n')
+            echo "Error on case $((i+1)): Script failed: $error_msg" >&2
             echo "ERROR" >> private_results.txt
         fi
-    else
-        # Capture stderr for error reporting
-        error_msg=$(./run.sh "$trip_duration" "$miles_traveled" "$receipts_amount" 2>&1 >/dev/null | tr -d '\n')
-        echo "Error on case $((i+1)): Script failed: $error_msg" >&2
-        echo "ERROR" >> private_results.txt
-    fi
-done
+    done
+fi
 
 echo
 echo "✅ Results generated successfully!" >&2
@@ -0,0 +1,268 @@
+import sys
+import argparse
+
+# Candidate-rule discovery over the residuals of calculate_reimbursement.
+#
+# Every candidate is an additive rule "trips matching <condition> get amount * basis", where
+# basis is 1 per trip, per day, per mile or per receipt dollar. Conditions come in families
+# (exact trip lengths, bands of days / miles / receipts / miles per day / receipts per day,
+# receipt cents quirks) plus pairwise conjunctions of the best single rules.
+#
+# With residual r = expected - calculated, the best amount for one rule has a closed form:
+# the L2 fit is sum(x * r) / sum(x * x) over the matched trips (x = basis), the L1 fit is the
+# median of r / x weighted by x. Both are computed for a whole block of rules at once:
+# conditions are rows of a (rules x cases) 0/1 matrix, the L2 sums are two matrix products
+# and the weighted medians share one sort of r / x, since r and x do not depend on the rule.
+# Rules are then ranked by how much they lower the average absolute error (the eval.sh
+# score). Conditions matching fewer than --min-support trips are dropped: with thousands of
+# candidates over a thousand cases, tiny groups mostly fit noise.
+#
+# With --rounds N the best rule is applied to the residuals and the search repeated, so
+# later rounds find what the earlier rules leave over. Requires NumPy.
+
+from tune_parameters import PUBLIC_CASES_JSON_PATH, DEFAULT_PARAMS
+from fit_parameters import FitCases
+from calculate_reimbursement import calculate_reimbursement_batch
+from case_store import open_cases
+
+BASES = ("trip", "day", "mile", "receipt_dollar") # Units a rule's amount is paid in
+BAND_EDGE_COUNT = 24 # Quantile edges per banded feature; every [edge_i, edge_j) is a candidate
+CENTS_BAND_WIDTH = 5 # Width of the receipt-cents bands
+DEFAULT_MIN_SUPPORT = 10
+DEFAULT_TOP = 20
+DEFAULT_CONJUNCTION_POOL = 60 # Best single conditions combined pairwise into "A and B" rules
+SCORE_BLOCK_CELLS = 1 << 21 # Rules x cases scored per block; bounds the temporaries to a few MB each
+OBJECTIVES = ("l1", "l2")
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        print("Error: rule discovery requires NumPy (pip install numpy).", file=sys.stderr)
+        raise
+    return np
+
+class RuleFeatures:
+    """Per-trip features that rule conditions and bases are built from."""
+
+    def __init__(self, fit_cases):
+        np = _import_numpy()
+        self.days = fit_cases.days
+        self.miles = fit_cases.miles
+        self.receipts = fit_cases.receipts
+        self.miles_per_day = np.where(self.days > 0, self.miles / np.maximum(self.days, 1.0), 0.0)
+        self.receipts_per_day = np.where(self.days > 0, self.receipts / np.maximum(self.days, 1.0), 0.0)
+        self.cents = np.rint(self.receipts * 100.0) % 100.0
+
+    def basis(self, name):
+        np = _import_numpy()
+        return {"trip": np.ones_like(self.days), "day": self.days,
+                "mile": self.miles, "receipt_dollar": self.receipts}[name]
+
+def _band_edges(np, values, count):
+    """Distinct interior quantiles of values, as the boundaries for band conditions."""
+    edges = np.unique(np.quantile(values, np.linspace(0.0, 1.0, count + 2)[1:-1]))
+    return [float(edge) for edge in edges]
+
+def _band_conditions(np, label, values, count):
+    edges = [-np.inf] + _band_edges(np, values, count) + [np.inf]
+    conditions = []
+    for i, low in enumerate(edges):
+        for high in edges[i + 1:]:
+            if low == -np.inf and high == np.inf:
+                continue # Matches every trip
+            if low == -np.inf:
+                description = f"{label} < {high:g}"
+            elif high == np.inf:
+                description = f"{label} >= {low:g}"
+            else:
+                description = f"{low:g} <= {label} < {high:g}"
+            conditions.append((description, (values >= low) & (values < high)))
+    return conditions
+
+def generate_conditions(features):
+    """Candidate conditions as {family: [(description, boolean mask over cases)]}."""
+    np = _import_numpy()
+    cents = features.cents
+    return {
+        "exact_days": [(f"days == {int(day)}", features.days == day) for day in np.unique(features.days)],
+        "day_bands": _band_conditions(np, "days", features.days, BAND_EDGE_COUNT),
+        "miles_bands": _band_conditions(np, "miles", features.miles, BAND_EDGE_COUNT),
+        "receipts_bands": _band_conditions(np, "receipts", features.receipts, BAND_EDGE_COUNT),
+        "miles_per_day_bands": _band_conditions(np, "miles/day", features.miles_per_day, BAND_EDGE_COUNT),
+        "receipts_per_day_bands": _band_conditions(np, "receipts/day", features.receipts_per_day, BAND_EDGE_COUNT),
+        "receipt_cents": [(f"receipt cents == {int(c):02d}", cents == c) for c in np.unique(cents)] +
+                         [(f"receipt cents end in {d}", cents % 10 == d) for d in range(10)] +
+                         [(f"receipt cents in [{low:02d}, {low + CENTS_BAND_WIDTH - 1:02d}]",
+                           (cents >= low) & (cents < low + CENTS_BAND_WIDTH)) for low in range(0, 100, CENTS_BAND_WIDTH)],
+    }
+
+def _unique_conditions(np, conditions, min_support):
+    """Drops conditions with too little support and all but the first of identical masks."""
+    seen = set()
+    kept = []
+    for family, description, mask in conditions:
+        support = int(mask.sum())
+        if support < min_support or support == len(mask):
+            continue
+        key = np.packbits(mask).tobytes()
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append((family, description, mask))
+    return kept
+
+def _weighted_medians(np, sorted_values, sorted_weights):
+    """Weighted median of sorted_values for each row of weights (a zero-weight row gives 0.0)."""
+    cumulative = np.cumsum(sorted_weights, axis=1)
+    half = cumulative[:, -1:] * 0.5
+    index = np.argmax(cumulative >= half, axis=1)
+    return np.where(cumulative[:, -1] > 0, sorted_values[index], 0.0)
+
+def score_rules(residuals, masks, basis, objective="l1"):
+    """Closed-form amounts for rules "add amount * basis where mask" and the resulting average absolute errors.
+
+    masks is a (rules x cases) boolean matrix; returns (amounts, errors), one per row.
+    """
+    np = _import_numpy()
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}'. Expected one of: {', '.join(OBJECTIVES)}")
+    num_cases = residuals.shape[0]
+    usable = basis > 0 # A trip with zero basis is unaffected by the rule
+    ratios = np.where(usable, residuals / np.where(usable, basis, 1.0), 0.0)
+    order = np.argsort(ratios, kind="stable")
+    sorted_ratios = ratios[order]
+    base_abs = np.abs(residuals)
+    base_total = base_abs.sum()
+
+    amounts = np.empty(masks.shape[0])
+    errors = np.empty(masks.shape[0])
+    block_rows = max(1, SCORE_BLOCK_CELLS // max(num_cases, 1))
+    for start in range(0, masks.shape[0], block_rows):
+        block = slice(start, start + block_rows)
+        weights = masks[block] * (basis * usable)
+        if objective == "l2":
+            denominators = weights @ basis
+            amount = np.where(denominators > 0, (weights @ residuals) / np.where(denominators > 0, denominators, 1.0), 0.0)
+        else:
+            amount = _weighted_medians(np, sorted_ratios, weights[:, order])
+        # Only matched trips change: error = sum |r| + sum over matches of (|r - a x| - |r|)
+        change = np.abs(residuals - amount[:, None] * basis) - base_abs
+        change *= masks[block]
+        amounts[block] = amount
+        errors[block] = (base_total + change.sum(axis=1)) / num_cases
+    return amounts, errors
+
+class RuleDiscovery:
+    """Generates candidate rules over a case set and ranks them against the current residuals."""
+
+    def __init__(self, test_cases, params=DEFAULT_PARAMS, min_support=DEFAULT_MIN_SUPPORT):
+        np = _import_numpy()
+        fit_cases = FitCases(test_cases)
+        self.features = RuleFeatures(fit_cases)
+        self.expected = fit_cases.expected
+        self.calculated = calculate_reimbursement_batch(fit_cases.days, fit_cases.miles, fit_cases.receipts, params)
+        self.residuals = self.expected - self.calculated
+        self.min_support = min_support
+        conditions = [(family, description, mask)
+                      for family, family_conditions in generate_conditions(self.features).items()
+                      for description, mask in family_conditions]
+        self.conditions = _unique_conditions(np, conditions, min_support)
+        self.applied = [] # Rules folded into the residuals by apply()
+
+    @property
+    def average_error(self):
+        np = _import_numpy()
+        return float(np.mean(np.abs(self.residuals)))
+
+    def _score(self, conditions, objective):
+        """Scores conditions under every basis; returns rule dicts, best first."""
+        np = _import_numpy()
+        masks = np.array([mask for _, _, mask in conditions], dtype=np.float64).reshape(len(conditions), -1)
+        rules = []
+        for basis_name in BASES:
+            amounts, errors = score_rules(self.residuals, masks, self.features.basis(basis_name), objective)
+            for (family, description, mask), amount, error in zip(conditions, amounts, errors):
+                rules.append({"family": family, "condition": description, "basis": basis_name,
+                              "amount": float(amount), "average_error": float(error),
+                              "support": int(mask.sum()), "mask": mask})
+        rules.sort(key=lambda rule: rule["average_error"])
+        return rules
+
+    def rank(self, objective="l1", conjunction_pool=DEFAULT_CONJUNCTION_POOL):
+        """All single-condition rules plus pairwise conjunctions of the best conditions, best first."""
+        np = _import_numpy()
+        singles = self._score(self.conditions, objective)
+        pool = []
+        seen = set()
+        for rule in singles:
+            if len(pool) >= conjunction_pool:
+                break
+            if rule["condition"] not in seen:
+                seen.add(rule["condition"])
+                pool.append((rule["family"], rule["condition"], rule["mask"]))
+        pairs = [(f"{family_a}+{family_b}", f"{description_a} and {description_b}", mask_a & mask_b)
+                 for i, (family_a, description_a, mask_a) in enumerate(pool)
+                 for family_b, description_b, mask_b in pool[i + 1:] if family_a != family_b]
+        pairs = _unique_conditions(np, pairs, self.min_support)
+        rules = singles + (self._score(pairs, objective) if pairs else [])
+        rules.sort(key=lambda rule: rule["average_error"])
+        return rules
+
+    def apply(self, rule):
+        """Folds a rule into the residuals, as if calculate_reimbursement implemented it."""
+        self.residuals = self.residuals - rule["amount"] * self.features.basis(rule["basis"]) * rule["mask"]
+        self.applied.append(rule)
+
+def describe_rule(rule):
+    unit = "" if rule["basis"] == "trip" else f" per {rule['basis'].replace('_', ' ')}"
+    return f"{rule['condition']}: {rule['amount']:+.4f}{unit}"
+
+def discover(test_cases, rounds=1, top=DEFAULT_TOP, objective="l1", min_support=DEFAULT_MIN_SUPPORT,
+             conjunction_pool=DEFAULT_CONJUNCTION_POOL):
+    """Prints the top rules for each round, applying the best one between rounds. Returns the applied rules."""
+    discovery = RuleDiscovery(test_cases, min_support=min_support)
+    print(f"--- Rule Discovery ---")
+    print(f"{len(discovery.conditions)} distinct conditions x {len(BASES)} bases over {len(discovery.expected)} cases; "
+          f"amounts fitted by {objective.upper()}.")
+    for round_number in range(1, rounds + 1):
+        current_error = discovery.average_error
+        rules = discovery.rank(objective, conjunction_pool)
+        print(f"\nRound {round_number}: current Average Error {current_error:.4f}; {len(rules)} rules scored")
+        for position, rule in enumerate(rules[:top], start=1):
+            print(f"  {position:3d}. {current_error - rule['average_error']:9.4f} better -> {rule['average_error']:.4f} "
+                  f"[{rule['family']}, {rule['support']} trips] {describe_rule(rule)}")
+        if not rules or rules[0]["average_error"] >= current_error:
+            print("No rule lowers the error further.")
+            break
+        if round_number < rounds:
+            discovery.apply(rules[0])
+            print(f"Applying: {describe_rule(rules[0])}")
+    if discovery.applied:
+        print(f"\nApplied {len(discovery.applied)} rules between rounds: Average Error "
+              f"{discovery.average_error:.4f} with them in place.")
+    print("-------------------------------------")
+    return discovery.applied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank candidate reimbursement rules by how much they lower the average error.")
+    parser.add_argument("--cases", default=PUBLIC_CASES_JSON_PATH, help="Cases file in public_cases.json format")
+    parser.add_argument("--rounds", type=int, default=1, help="Apply the best rule and search again this many times")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Rules listed per round")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="l1", help="Fit amounts by median (l1) or mean (l2)")
+    parser.add_argument("--min-support", type=int, default=DEFAULT_MIN_SUPPORT, help="Minimum trips a rule must match")
+    parser.add_argument("--conjunction-pool", type=int, default=DEFAULT_CONJUNCTION_POOL,
+                        help="Best single conditions combined pairwise (0 disables conjunctions)")
+    args = parser.parse_args()
+    if args.rounds <= 0 or args.top <= 0 or args.min_support <= 0 or args.conjunction_pool < 0:
+        parser.error("--rounds, --top and --min-support must be positive; --conjunction-pool must not be negative")
+
+    try:
+        test_cases = open_cases(args.cases)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load cases from {args.cases}: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        discover(test_cases, args.rounds, args.top, args.objective, args.min_support, args.conjunction_pool)
+    except ImportError:
+        sys.exit(1)
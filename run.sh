@@ -1,5 +1,21 @@
 #!/bin/bash
 
+# Execute the Python script
+# Assuming the python script is in the strategy1_interview_driven subdirectory
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" &> /dev/null && pwd)"
+PYTHON_SCRIPT_PATH="$SCRIPT_DIR/strategy1_interview_driven/calculate_reimbursement.py"
+
+if [ ! -f "$PYTHON_SCRIPT_PATH" ]; then
+    echo "Error: Python script not found at $PYTHON_SCRIPT_PATH" >&2
+    exit 1
+fi
+
+# Batch mode: one result per line for every trip in a JSON array / NDJSON / CSV file (or stdin)
+# Usage: ./run.sh --batch [<input_file>|-] [--format json|ndjson|csv]
+if [ "$1" = "--batch" ]; then
+    exec python3 "$PYTHON_SCRIPT_PATH" "$@"
+fi
+
 # Ensure three arguments are provided
 if [ "$#" -ne 3 ]; then
     echo "Usage: ./run.sh <trip_duration_days> <miles_traveled> <total_receipts_amount>" >&2
@@ -10,14 +26,37 @@ TRIP_DURATION_DAYS=$1
 MILES_TRAVELED=$2
 TOTAL_RECEIPTS_AMOUNT=$3
 
-# Execute the Python script
-# Assuming the python script is in the strategy1_interview_driven subdirectory
-SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" &> /dev/null && pwd)"
-PYTHON_SCRIPT_PATH="$SCRIPT_DIR/strategy1_interview_driven/calculate_reimbursement.py"
-
-if [ ! -f "$PYTHON_SCRIPT_PATH" ]; then
-    echo "Error: Python script not found at $PYTHON_SCRIPT_PATH" >&2
-    exit 1
+# Fast path: if strategy1_interview_driven/reimbursement_server.py is running, ask it over its
+# Unix socket instead of cold-starting Python. Anything other than a plain number falls through
+# to the direct invocation below, which also produces the usual error messages.
+# The socket lives in a directory only this user can write ($XDG_RUNTIME_DIR or a 0700 directory
+# the server creates) and must be owned by this user; the client also checks the server's uid.
+if [ -n "$REIMBURSEMENT_SOCKET" ]; then
+    SOCKET_PATH="$REIMBURSEMENT_SOCKET"
+elif [ -n "$XDG_RUNTIME_DIR" ]; then
+    SOCKET_PATH="$XDG_RUNTIME_DIR/reimbursement.sock"
+else
+    SOCKET_PATH="/tmp/reimbursement-$UID/reimbursement.sock"
+fi
+NUMBER_PATTERN='^[-+.0-9eE]+$'
+if [ -S "$SOCKET_PATH" ] && [ -O "$SOCKET_PATH" ] && [[ $1 =~ $NUMBER_PATTERN && $2 =~ $NUMBER_PATTERN && $3 =~ $NUMBER_PATTERN ]]; then
+    # The client is a small C program (a Python client would cost a cold start of its own),
+    # compiled on first use into the user's cache directory.
+    CLIENT_SOURCE="$SCRIPT_DIR/strategy1_interview_driven/reimbursement_client.c"
+    CLIENT_BINARY="${XDG_CACHE_HOME:-$HOME/.cache}/top-coder-reimbursement/reimbursement_client"
+    if [ ! -x "$CLIENT_BINARY" ] || [ "$CLIENT_SOURCE" -nt "$CLIENT_BINARY" ]; then
+        mkdir -p -m 700 "$(dirname "$CLIENT_BINARY")" 2>/dev/null &&
+            cc -O2 -o "$CLIENT_BINARY.$$" "$CLIENT_SOURCE" 2>/dev/null &&
+            mv -f "$CLIENT_BINARY.$$" "$CLIENT_BINARY"
+        rm -f "$CLIENT_BINARY.$$"
+    fi
+    if [ -x "$CLIENT_BINARY" ]; then
+        result=$("$CLIENT_BINARY" "$SOCKET_PATH" "$1" "$2" "$3" 2>/dev/null)
+        if [[ $result =~ ^-?[0-9]+\.[0-9]+$ ]]; then
+            echo "$result"
+            exit 0
+        fi
+    fi
 fi
 
 python3 "$PYTHON_SCRIPT_PATH" "$TRIP_DURATION_DAYS" "$MILES_TRAVELED" "$TOTAL_RECEIPTS_AMOUNT"
\ No newline at end of file
@@ -0,0 +1,286 @@
+import sys
+import os
+import json
+import time
+import random
+import socket
+import argparse
+from contextlib import contextmanager
+
+# Resumable random search shared by any number of worker processes, on one host or on
+# several hosts sharing a filesystem. All state lives in an append-only JSONL trial log:
+#
+#   {"type": "search", ...}               first line: seed, trial count, batch size, base params
+#   {"type": "claim", "batch": b, ...}    a worker took batch b (trials b*size .. (b+1)*size-1)
+#   {"type": "result", "batch": b, ...}   the batch's average errors and its best candidate
+#
+# Candidate i is drawn from random.Random(f"{seed}-{i}"), so every worker (and every resumed
+# run) regenerates exactly the same candidates and only the claimed batch numbers need to be
+# logged. Every read-modify-append of the log happens under a POSIX lock (lockf), which,
+# unlike flock, is also honoured over NFS.
+#
+# A batch is handed out again only if it has no result and its claim is stale: older than
+# the lease, or made by a process on this host that no longer exists. A killed run therefore
+# resumes where it stopped and never re-evaluates a batch that has a result.
+#
+# promote writes the best parameters found into DEFAULT_PARAMS with
+# tune_parameters.persist_parameters, which replaces calculate_reimbursement.py atomically.
+
+from tune_parameters import PUBLIC_CASES_JSON_PATH, DEFAULT_PARAMS, PARAMETER_RANGES, \
+    evaluate_parameter_sets, evaluate_parameters, sample_random_parameters, persist_parameters
+from case_store import open_cases
+
+LOG_FORMAT_VERSION = 1
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_LEASE_SECONDS = 600.0
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def candidate_params(seed, trial_index, base_params):
+    """Trial trial_index of the search seeded with seed; identical in every process."""
+    return sample_random_parameters(base_params, random.Random(f"{seed}-{trial_index}"))
+
+def _claim_is_stale(claim, lease_seconds, now):
+    if now - claim["time"] > lease_seconds:
+        return True
+    host, _, pid = claim["worker"].rpartition(":")
+    if host == socket.gethostname():
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True # Claimer died on this host; no need to wait out the lease
+        except (ValueError, PermissionError):
+            pass
+    return False
+
+class TrialLog:
+    """The JSONL trial log: locked appends plus an incrementally parsed view of its records."""
+
+    def __init__(self, path):
+        import fcntl # POSIX only
+        self._fcntl = fcntl
+        self.path = path
+        self._file = open(path, "a+")
+        self._offset = 0
+        self._partial = ""
+        self.search = None
+        self.claims = {} # batch -> latest claim record
+        self.results = {} # batch -> first result record
+
+    def close(self):
+        self._file.close()
+
+    @contextmanager
+    def locked(self):
+        """Exclusive lock on the log; the view is refreshed on entry."""
+        self._fcntl.lockf(self._file, self._fcntl.LOCK_EX)
+        try:
+            self.refresh()
+            yield self
+        finally:
+            self._fcntl.lockf(self._file, self._fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Parses records appended since the last refresh."""
+        self._file.seek(self._offset)
+        data = self._file.read()
+        self._offset = self._file.tell()
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop() # Incomplete last line (a writer died mid-record): retried next time
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Warning: skipping unreadable record in {self.path}: {e}", file=sys.stderr)
+
+    def _apply(self, record):
+        record_type = record["type"]
+        if record_type == "search":
+            if self.search is None:
+                self.search = record
+        elif record_type == "claim":
+            self.claims[record["batch"]] = record
+        elif record_type == "result":
+            self.results.setdefault(record["batch"], record) # A duplicate evaluation keeps the first result
+        else:
+            raise ValueError(f"unknown record type {record_type!r}")
+
+    def append(self, record):
+        """Appends one record; the caller must hold the lock."""
+        self._file.seek(0, os.SEEK_END)
+        prefix = ""
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                prefix = "\n" # Terminate a record a killed writer left unfinished
+            self._file.seek(0, os.SEEK_END)
+        self._file.write(prefix + json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.refresh()
+
+    @property
+    def num_batches(self):
+        return -(-self.search["num_trials"] // self.search["batch_size"])
+
+    def best(self):
+        """(error, params, trial index) of the best evaluated candidate, or None."""
+        best = None
+        for result in self.results.values():
+            if result["best_params"] is not None and (best is None or result["best_error"] < best[0]):
+                best = (result["best_error"], result["best_params"], result["best_index"])
+        return best
+
+def start_search(log, num_trials, batch_size, seed, cases_path, base_params):
+    """Writes the search record unless the log already has one (which must match)."""
+    with log.locked():
+        if log.search is None:
+            log.append({"type": "search", "version": LOG_FORMAT_VERSION, "num_trials": num_trials,
+                        "batch_size": batch_size, "seed": seed, "cases": os.path.abspath(cases_path),
+                        "base_params": base_params, "parameter_ranges": PARAMETER_RANGES,
+                        "created": time.time()})
+            return True
+        existing = log.search
+        if (existing["num_trials"], existing["batch_size"], existing["seed"]) != (num_trials, batch_size, seed):
+            raise ValueError(f"{log.path} already holds a different search "
+                             f"({existing['num_trials']} trials, batch size {existing['batch_size']}, seed {existing['seed']})")
+        return False
+
+def claim_batch(log, lease_seconds):
+    """Claims the lowest batch without a result and without a live claim; None when none is left."""
+    with log.locked():
+        now = time.time()
+        for batch in range(log.num_batches):
+            if batch in log.results:
+                continue
+            claim = log.claims.get(batch)
+            if claim is not None and not _claim_is_stale(claim, lease_seconds, now):
+                continue
+            log.append({"type": "claim", "batch": batch, "worker": worker_id(), "time": now})
+            return batch
+    return None
+
+def run_batch(log, batch, test_cases):
+    """Evaluates one batch and appends its result; returns (best error, best index)."""
+    search = log.search
+    first = batch * search["batch_size"]
+    indices = range(first, min(first + search["batch_size"], search["num_trials"]))
+    candidates = [candidate_params(search["seed"], index, search["base_params"]) for index in indices]
+    errors = evaluate_parameter_sets(candidates, test_cases)
+
+    best_offset = min(range(len(errors)), key=errors.__getitem__)
+    finite = errors[best_offset] != float('inf')
+    with log.locked():
+        log.append({"type": "result", "batch": batch, "worker": worker_id(), "time": time.time(),
+                    "first_index": first, "errors": errors,
+                    "best_index": first + best_offset if finite else None,
+                    "best_error": errors[best_offset] if finite else None,
+                    "best_params": candidates[best_offset] if finite else None})
+    return errors[best_offset], first + best_offset
+
+def work(log, lease_seconds):
+    """Claims and evaluates batches until none is left. Returns the number of batches this worker ran."""
+    with log.locked():
+        if log.search is None:
+            raise ValueError(f"{log.path} has no search record; start one with the 'start' command")
+    test_cases = open_cases(log.search["cases"])
+    completed = 0
+    while True:
+        batch = claim_batch(log, lease_seconds)
+        if batch is None:
+            return completed
+        error, index = run_batch(log, batch, test_cases)
+        completed += 1
+        best = log.best()
+        print(f"Batch {batch + 1}/{log.num_batches} done: best {error:.4f} (trial {index}); "
+              f"search best {best[0]:.4f} (trial {best[2]}); {len(log.results)}/{log.num_batches} batches complete")
+
+def print_status(log):
+    with log.locked():
+        if log.search is None:
+            print(f"{log.path} has no search record.")
+            return
+        now = time.time()
+        live_claims = [batch for batch, claim in log.claims.items()
+                       if batch not in log.results and not _claim_is_stale(claim, float('inf'), now)]
+        trials_done = sum(len(result["errors"]) for result in log.results.values())
+        print(f"Search: {log.search['num_trials']} trials in batches of {log.search['batch_size']}, seed {log.search['seed']}")
+        print(f"Completed: {len(log.results)}/{log.num_batches} batches ({trials_done} trials); in progress: {len(live_claims)}")
+        best = log.best()
+        if best is not None:
+            print(f"Best: Average Error {best[0]:.4f} (trial {best[2]})")
+            for key, value in best[1].items():
+                print(f"  '{key}': {value:.4f}" if isinstance(value, float) else f"  '{key}': {value}")
+
+def promote(log, force=False):
+    """Writes the best parameters into DEFAULT_PARAMS if they beat the current ones on the search's cases."""
+    with log.locked():
+        if log.search is None:
+            raise ValueError(f"{log.path} has no search record")
+        best = log.best()
+        if best is None:
+            print("No evaluated candidates to promote.")
+            return False
+        best_error, best_params, best_index = best
+        current_error = evaluate_parameters(DEFAULT_PARAMS, open_cases(log.search["cases"]))
+        if best_error >= current_error and not force:
+            print(f"Not promoting: best {best_error:.4f} does not beat the current DEFAULT_PARAMS ({current_error:.4f}).")
+            return False
+        changed = {name: value for name, value in best_params.items() if name in DEFAULT_PARAMS and DEFAULT_PARAMS[name] != value}
+        missing = persist_parameters(changed)
+        if missing:
+            print(f"Warning: not found in DEFAULT_PARAMS: {', '.join(missing)}", file=sys.stderr)
+        print(f"Promoted trial {best_index} (Average Error {best_error:.4f}, was {current_error:.4f}): "
+              f"{len(changed) - len(missing)} parameters updated.")
+        return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable random search shared through an append-only trial log.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    start_parser = subparsers.add_parser("start", help="Create the search (if new) and work on it")
+    start_parser.add_argument("log", help="Trial log (JSONL)")
+    start_parser.add_argument("num_trials", type=int)
+    start_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    start_parser.add_argument("--seed", type=int, default=0)
+    start_parser.add_argument("--cases", default=PUBLIC_CASES_JSON_PATH, help="Cases file in public_cases.json format")
+    work_parser = subparsers.add_parser("work", help="Join an existing search as another worker (or resume it)")
+    work_parser.add_argument("log")
+    for subparser in (start_parser, work_parser):
+        subparser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                               help="Seconds after which another worker's unfinished claim is taken over")
+    status_parser = subparsers.add_parser("status", help="Show progress and the best candidate")
+    status_parser.add_argument("log")
+    promote_parser = subparsers.add_parser("promote", help="Write the best candidate into DEFAULT_PARAMS")
+    promote_parser.add_argument("log")
+    promote_parser.add_argument("--force", action="store_true", help="Promote even if it does not beat the current parameters")
+    args = parser.parse_args()
+
+    if args.command == "start" and (args.num_trials <= 0 or args.batch_size <= 0):
+        parser.error("num_trials and --batch-size must be positive")
+    if args.command in ("status", "promote", "work") and not os.path.exists(args.log):
+        print(f"Error: Trial log not found at {args.log}", file=sys.stderr)
+        sys.exit(1)
+
+    log = TrialLog(args.log)
+    try:
+        if args.command == "start":
+            if start_search(log, args.num_trials, args.batch_size, args.seed, args.cases, dict(DEFAULT_PARAMS)):
+                print(f"Started search in {args.log}.")
+            else:
+                print(f"Resuming search in {args.log}.")
+        if args.command in ("start", "work"):
+            completed = work(log, args.lease)
+            print(f"No batches left; this worker completed {completed}.")
+            print_status(log)
+        elif args.command == "status":
+            print_status(log)
+        elif args.command == "promote":
+            promote(log, force=args.force)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        log.close()
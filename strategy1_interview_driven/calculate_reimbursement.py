@@ -23,28 +23,78 @@ DEFAULT_PARAMS = {
     "receipt_reimbursement_cap_amount": 750.0 # Max amount for receipt reimbursement - manually set
 }
 
-def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount, params=DEFAULT_PARAMS):
-    """Calculates the reimbursement amount based on baseline rules."""
+class CompiledParams:
+    """Validated, attribute-access form of a parameter dict with the tier offsets precomputed.
+
+    Built by compile_params(). The offsets are the constant parts of the tier formulas,
+    computed with the same operations calculate_reimbursement used to repeat per trip,
+    so results are unchanged.
+    """
+
+    __slots__ = tuple(DEFAULT_PARAMS) + (
+        "mileage_t1_full", # mileage_t1_threshold_miles * mileage_t1_rate
+        "mileage_t2_offset", # Reimbursement for all of tiers 1 and 2
+        "receipt_t1_full", # receipt_t1_threshold_amount * receipt_t1_rate
+        "receipt_t2_offset", # Reimbursement for all of tiers 1 and 2
+    )
+
+    def __init__(self, params):
+        missing = [name for name in DEFAULT_PARAMS if name not in params]
+        if missing:
+            raise ValueError(f"Missing reimbursement parameters: {', '.join(missing)}")
+        for name in DEFAULT_PARAMS:
+            value = params[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"Parameter '{name}' must be a finite number, got {value!r}")
+            setattr(self, name, value)
+
+        self.mileage_t1_full = self.mileage_t1_threshold_miles * self.mileage_t1_rate
+        self.mileage_t2_offset = self.mileage_t1_full + \
+            ((self.mileage_t2_threshold_miles - self.mileage_t1_threshold_miles) * self.mileage_t2_rate)
+        self.receipt_t1_full = self.receipt_t1_threshold_amount * self.receipt_t1_rate
+        self.receipt_t2_offset = self.receipt_t1_full + \
+            ((self.receipt_t2_threshold_amount - self.receipt_t1_threshold_amount) * self.receipt_t2_rate)
+
+    def as_dict(self):
+        """Returns the plain parameter dict this object was compiled from."""
+        return {name: getattr(self, name) for name in DEFAULT_PARAMS}
+
+def compile_params(params):
+    """Validates a parameter dict once and returns it as CompiledParams (passed through if already compiled).
+
+    Raises ValueError if a parameter is missing or not a finite number.
+    """
+    if isinstance(params, CompiledParams):
+        return params
+    return CompiledParams(params)
+
+COMPILED_DEFAULT_PARAMS = compile_params(DEFAULT_PARAMS)
+
+def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount, params=COMPILED_DEFAULT_PARAMS):
+    """Calculates the reimbursement amount based on baseline rules.
+
+    params may be a parameter dict or, on hot paths, the result of compile_params().
+    """
+    if params.__class__ is not CompiledParams:
+        params = compile_params(params)
 
     # Rule 1: Base Per Diem (Initial)
-    per_diem_reimbursement = trip_duration_days * params["per_diem_rate"]
+    per_diem_reimbursement = trip_duration_days * params.per_diem_rate
 
     # Rule 2, 3 & New: 3-Tier Mileage Reimbursement
     # Tier 1: Up to mileage_t1_threshold_miles (e.g., 100 miles) at mileage_t1_rate (e.g., $0.58/mile)
     # Tier 2: Miles between mileage_t1_threshold_miles and mileage_t2_threshold_miles (e.g., 100.01 to 500 miles) at mileage_t2_rate (e.g., $0.30/mile)
     # Tier 3: Miles above mileage_t2_threshold_miles (e.g., >500 miles) at mileage_t3_rate (e.g., $0.20/mile)
-    mileage_reimbursement = 0.0
     if miles_traveled <= 0: # Handle zero or negative miles explicitly
         mileage_reimbursement = 0.0
-    elif miles_traveled <= params["mileage_t1_threshold_miles"]:
-        mileage_reimbursement = miles_traveled * params["mileage_t1_rate"]
-    elif miles_traveled <= params["mileage_t2_threshold_miles"]:
-        mileage_reimbursement = (params["mileage_t1_threshold_miles"] * params["mileage_t1_rate"]) + \
-                                ((miles_traveled - params["mileage_t1_threshold_miles"]) * params["mileage_t2_rate"])
-    else: # miles_traveled > params["mileage_t2_threshold_miles"]
-        mileage_reimbursement = (params["mileage_t1_threshold_miles"] * params["mileage_t1_rate"]) + \
-                                ((params["mileage_t2_threshold_miles"] - params["mileage_t1_threshold_miles"]) * params["mileage_t2_rate"]) + \
-                                ((miles_traveled - params["mileage_t2_threshold_miles"]) * params["mileage_t3_rate"]) 
+    elif miles_traveled <= params.mileage_t1_threshold_miles:
+        mileage_reimbursement = miles_traveled * params.mileage_t1_rate
+    elif miles_traveled <= params.mileage_t2_threshold_miles:
+        mileage_reimbursement = params.mileage_t1_full + \
+                                ((miles_traveled - params.mileage_t1_threshold_miles) * params.mileage_t2_rate)
+    else: # miles_traveled > params.mileage_t2_threshold_miles
+        mileage_reimbursement = params.mileage_t2_offset + \
+                                ((miles_traveled - params.mileage_t2_threshold_miles) * params.mileage_t3_rate)
 
     # Receipt Reimbursement - with specific rounding quirks
     # Based on interview: "If your receipts end in 49 or 99 cents, you often get a little extra money."
@@ -58,42 +108,396 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     # 3-Tier Receipt Reimbursement
     if rounded_receipts_amount <= 0:
         receipt_reimbursement = 0.0
-    elif rounded_receipts_amount <= params["receipt_t1_threshold_amount"]:
-        receipt_reimbursement = rounded_receipts_amount * params["receipt_t1_rate"]
-    elif rounded_receipts_amount <= params["receipt_t2_threshold_amount"]:
-        receipt_reimbursement = (params["receipt_t1_threshold_amount"] * params["receipt_t1_rate"]) + \
-                                ((rounded_receipts_amount - params["receipt_t1_threshold_amount"]) * params["receipt_t2_rate"])
+    elif rounded_receipts_amount <= params.receipt_t1_threshold_amount:
+        receipt_reimbursement = rounded_receipts_amount * params.receipt_t1_rate
+    elif rounded_receipts_amount <= params.receipt_t2_threshold_amount:
+        receipt_reimbursement = params.receipt_t1_full + \
+                                ((rounded_receipts_amount - params.receipt_t1_threshold_amount) * params.receipt_t2_rate)
     else: # Above receipt_t2_threshold_amount
-        receipt_reimbursement = (params["receipt_t1_threshold_amount"] * params["receipt_t1_rate"]) + \
-                                ((params["receipt_t2_threshold_amount"] - params["receipt_t1_threshold_amount"]) * params["receipt_t2_rate"]) + \
-                                ((rounded_receipts_amount - params["receipt_t2_threshold_amount"]) * params["receipt_t3_rate"])
+        receipt_reimbursement = params.receipt_t2_offset + \
+                                ((rounded_receipts_amount - params.receipt_t2_threshold_amount) * params.receipt_t3_rate)
 
     # Apply cap to receipt reimbursement
-    receipt_reimbursement = min(receipt_reimbursement, params["receipt_reimbursement_cap_amount"])
+    if receipt_reimbursement > params.receipt_reimbursement_cap_amount:
+        receipt_reimbursement = params.receipt_reimbursement_cap_amount
 
     total_reimbursement = per_diem_reimbursement + mileage_reimbursement + receipt_reimbursement
 
     # Rule #4: 5-Day Trip Bonus (Hypothesis)
     if trip_duration_days == 5:
-        total_reimbursement += params["five_day_trip_bonus_amount"]
+        total_reimbursement += params.five_day_trip_bonus_amount
 
     # Rule #7: Efficiency Bonus (Mileage Related)
     # If miles_traveled / trip_duration_days > 150, add $50 bonus
     if trip_duration_days > 0:
         miles_per_day = miles_traveled / float(trip_duration_days) # Ensure float division
-        if miles_per_day > params["mileage_efficiency_threshold_miles_per_day"]:
-            total_reimbursement += params["mileage_efficiency_bonus_amount"]
+        if miles_per_day > params.mileage_efficiency_threshold_miles_per_day:
+            total_reimbursement += params.mileage_efficiency_bonus_amount
 
     # Rule #8: Short Trip / Low Mileage Penalty
-    if trip_duration_days <= params["short_trip_day_threshold"] and \
-       miles_traveled <= params["low_mileage_threshold_miles"]:
-        total_reimbursement *= params["low_reimbursement_multiplier"]
+    if trip_duration_days <= params.short_trip_day_threshold and \
+       miles_traveled <= params.low_mileage_threshold_miles:
+        total_reimbursement *= params.low_reimbursement_multiplier
+
+    return total_reimbursement
+
+# --- Per-component view of calculate_reimbursement ---
+# The total is (per diem + mileage + receipts + 5-day bonus + efficiency bonus) * short-trip
+# multiplier, where an absent bonus is 0.0 and an absent penalty is 1.0 (both exact no-ops).
+# Tuning code caches components and recomputes only those whose parameters changed.
+# Component functions take (days, miles, rounded receipts, params): the .49/.99 rounding
+# needs no parameters, so callers apply round_receipts_amount() once per trip.
+# These functions must stay in step with calculate_reimbursement above; tune_parameters'
+# IncrementalEvaluator checks that they reproduce it exactly whenever it builds its caches.
+
+COMPONENT_PARAMETERS = {
+    "per_diem": ("per_diem_rate",),
+    "mileage": ("mileage_t1_threshold_miles", "mileage_t1_rate", "mileage_t2_threshold_miles",
+                "mileage_t2_rate", "mileage_t3_rate"),
+    "receipts": ("receipt_t1_threshold_amount", "receipt_t1_rate", "receipt_t2_threshold_amount",
+                 "receipt_t2_rate", "receipt_t3_rate", "receipt_reimbursement_cap_amount"),
+    "five_day_bonus": ("five_day_trip_bonus_amount",),
+    "efficiency_bonus": ("mileage_efficiency_threshold_miles_per_day", "mileage_efficiency_bonus_amount"),
+    "short_trip_multiplier": ("short_trip_day_threshold", "low_mileage_threshold_miles", "low_reimbursement_multiplier"),
+}
+
+def per_diem_component(trip_duration_days, miles_traveled, rounded_receipts_amount, params):
+    return trip_duration_days * params.per_diem_rate
+
+def mileage_component(trip_duration_days, miles_traveled, rounded_receipts_amount, params):
+    if miles_traveled <= 0:
+        return 0.0
+    if miles_traveled <= params.mileage_t1_threshold_miles:
+        return miles_traveled * params.mileage_t1_rate
+    if miles_traveled <= params.mileage_t2_threshold_miles:
+        return params.mileage_t1_full + ((miles_traveled - params.mileage_t1_threshold_miles) * params.mileage_t2_rate)
+    return params.mileage_t2_offset + ((miles_traveled - params.mileage_t2_threshold_miles) * params.mileage_t3_rate)
+
+def round_receipts_amount(total_receipts_amount):
+    """The .49/.99 receipt quirk: those amounts are ceil()'d, everything else trunc()'d."""
+    cents_val = round((total_receipts_amount - math.trunc(total_receipts_amount)) * 100)
+    if cents_val == 49 or cents_val == 99:
+        return math.ceil(total_receipts_amount)
+    return math.trunc(total_receipts_amount)
+
+def receipt_component(trip_duration_days, miles_traveled, rounded_receipts_amount, params):
+    if rounded_receipts_amount <= 0:
+        receipt_reimbursement = 0.0
+    elif rounded_receipts_amount <= params.receipt_t1_threshold_amount:
+        receipt_reimbursement = rounded_receipts_amount * params.receipt_t1_rate
+    elif rounded_receipts_amount <= params.receipt_t2_threshold_amount:
+        receipt_reimbursement = params.receipt_t1_full + \
+                                ((rounded_receipts_amount - params.receipt_t1_threshold_amount) * params.receipt_t2_rate)
+    else:
+        receipt_reimbursement = params.receipt_t2_offset + \
+                                ((rounded_receipts_amount - params.receipt_t2_threshold_amount) * params.receipt_t3_rate)
+
+    if receipt_reimbursement > params.receipt_reimbursement_cap_amount:
+        return params.receipt_reimbursement_cap_amount
+    return receipt_reimbursement
+
+def five_day_bonus_component(trip_duration_days, miles_traveled, rounded_receipts_amount, params):
+    return params.five_day_trip_bonus_amount if trip_duration_days == 5 else 0.0
+
+def efficiency_bonus_component(trip_duration_days, miles_traveled, rounded_receipts_amount, params):
+    if trip_duration_days > 0 and \
+       miles_traveled / float(trip_duration_days) > params.mileage_efficiency_threshold_miles_per_day:
+        return params.mileage_efficiency_bonus_amount
+    return 0.0
+
+def short_trip_multiplier_component(trip_duration_days, miles_traveled, rounded_receipts_amount, params):
+    if trip_duration_days <= params.short_trip_day_threshold and \
+       miles_traveled <= params.low_mileage_threshold_miles:
+        return params.low_reimbursement_multiplier
+    return 1.0
+
+COMPONENT_FUNCTIONS = {
+    "per_diem": per_diem_component,
+    "mileage": mileage_component,
+    "receipts": receipt_component,
+    "five_day_bonus": five_day_bonus_component,
+    "efficiency_bonus": efficiency_bonus_component,
+    "short_trip_multiplier": short_trip_multiplier_component,
+}
+
+def combine_components(per_diem, mileage, receipts, five_day_bonus, efficiency_bonus, short_trip_multiplier):
+    """Reassembles the total from its components with calculate_reimbursement's operation order."""
+    return (per_diem + mileage + receipts + five_day_bonus + efficiency_bonus) * short_trip_multiplier
+
+# Rows per block in calculate_reimbursement_batch; keeps every temporary array cache-resident.
+BATCH_BLOCK_SIZE = 8192
+
+def _tiered_amounts(np, amount, t1_threshold, t2_threshold, t1_rate, t2_rate, t3_rate, t1_full, t2_offset):
+    """Vectorized 3-tier schedule shared by mileage and receipts.
+
+    Branches are selected with 0.0/1.0 masks instead of np.where: x * 1.0 and
+    x + 0.0 are exact, so each element gets the same value the scalar branch
+    computes, bit for bit, without np.where's per-element branching cost.
+    The parameters may be scalars or (K, 1) columns (see CompiledParamMatrix).
+    """
+    in_t2 = (amount > t1_threshold).astype(np.float64)
+    in_t3 = (amount > np.maximum(t1_threshold, t2_threshold)).astype(np.float64) # t1 > t2 skips straight to tier 3, as in the scalar path
+
+    tier1 = np.maximum(amount, 0.0) * t1_rate # Zero or negative amounts reimburse nothing
+    tier1 *= 1.0 - in_t2
+    tier2 = amount - t1_threshold
+    tier2 *= t2_rate
+    tier2 += t1_full
+    tier2 *= in_t2 - in_t3
+    tier3 = amount - t2_threshold
+    tier3 *= t3_rate
+    tier3 += t2_offset
+    tier3 *= in_t3
+
+    tier1 += tier2
+    tier1 += tier3
+    return tier1
+
+def _calculate_reimbursement_block(np, days, miles, receipts, params, out):
+    """Applies every rule to one block of trips, writing totals into out.
+
+    With CompiledParamMatrix params, out is (K, len(days)): one row per parameter set.
+    """
+    # Rule 1: Base Per Diem (Initial)
+    np.multiply(days, params.per_diem_rate, out=out)
+
+    # Rule 2, 3 & New: 3-Tier Mileage Reimbursement
+    out += _tiered_amounts(np, miles,
+                           params.mileage_t1_threshold_miles, params.mileage_t2_threshold_miles,
+                           params.mileage_t1_rate, params.mileage_t2_rate, params.mileage_t3_rate,
+                           params.mileage_t1_full, params.mileage_t2_offset)
 
+    # Receipt Reimbursement - .49/.99 cents are ceil()'d, everything else trunc()'d.
+    # Both quirk endings imply a positive fractional part, so ceil() == trunc() + 1 there.
+    rounded_receipts_amount = np.trunc(receipts)
+    cents_val = receipts - rounded_receipts_amount
+    cents_val *= 100
+    np.round(cents_val, out=cents_val)
+    rounded_receipts_amount += (cents_val == 49) | (cents_val == 99)
+
+    # 3-Tier Receipt Reimbursement, then the cap
+    receipt_reimbursement = _tiered_amounts(np, rounded_receipts_amount,
+                                            params.receipt_t1_threshold_amount, params.receipt_t2_threshold_amount,
+                                            params.receipt_t1_rate, params.receipt_t2_rate, params.receipt_t3_rate,
+                                            params.receipt_t1_full, params.receipt_t2_offset)
+    np.minimum(receipt_reimbursement, params.receipt_reimbursement_cap_amount, out=receipt_reimbursement)
+    out += receipt_reimbursement
+
+    # Rule #4: 5-Day Trip Bonus (Hypothesis)
+    out += (days == 5).astype(np.float64) * params.five_day_trip_bonus_amount
+
+    # Rule #7: Efficiency Bonus (Mileage Related)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        miles_per_day = miles / days
+    efficient = (miles_per_day > params.mileage_efficiency_threshold_miles_per_day) & (days > 0)
+    out += efficient.astype(np.float64) * params.mileage_efficiency_bonus_amount
+
+    # Rule #8: Short Trip / Low Mileage Penalty (factor is exactly 1.0 or the multiplier)
+    penalized = ((days <= params.short_trip_day_threshold) & (miles <= params.low_mileage_threshold_miles)).astype(np.float64)
+    factor = 1.0 - penalized
+    factor += penalized * params.low_reimbursement_multiplier
+    out *= factor
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount, params=COMPILED_DEFAULT_PARAMS):
+    """Vectorized calculate_reimbursement over NumPy arrays (or anything array-like).
+
+    Inputs are broadcast against each other and the result is a float64 array of
+    the same shape. Every rule of the scalar function is applied in one pass per
+    block, with the same floating point operations in the same order, so the
+    results match calculate_reimbursement exactly.
+    """
+    import numpy as np # Imported lazily so the single-trip CLI does not pay for it
+
+    params = compile_params(params)
+    days, miles, receipts = np.broadcast_arrays(
+        np.asarray(trip_duration_days, dtype=np.float64),
+        np.asarray(miles_traveled, dtype=np.float64),
+        np.asarray(total_receipts_amount, dtype=np.float64),
+    )
+    shape = days.shape
+    days, miles, receipts = days.ravel(), miles.ravel(), receipts.ravel()
+
+    total_reimbursement = np.empty(days.shape[0], dtype=np.float64)
+    for start in range(0, days.shape[0], BATCH_BLOCK_SIZE):
+        block = slice(start, start + BATCH_BLOCK_SIZE)
+        _calculate_reimbursement_block(np, days[block], miles[block], receipts[block], params, total_reimbursement[block])
+
+    return total_reimbursement.reshape(shape)
+
+# --- Many parameter sets at once ---
+# Tuning scores thousands of candidate parameter sets against the same trips. Stacking the
+# candidates as (K, 1) columns lets the batch kernel above broadcast them against (N,) trip
+# arrays, computing a K x N matrix of results in one pass instead of K separate passes.
+
+class CompiledParamMatrix:
+    """K compiled parameter sets stored column-wise, one (K, 1) float64 array per attribute.
+
+    Has the same attributes as CompiledParams, so the batch kernel accepts it unchanged.
+    Slicing (matrix[start:stop]) selects a subset of the parameter sets without copying.
+    """
+
+    __slots__ = CompiledParams.__slots__ + ("values",)
+
+    def __init__(self, values):
+        self.values = values # (K, len(CompiledParams.__slots__)) array, columns in __slots__ order
+        for column, name in enumerate(CompiledParams.__slots__):
+            setattr(self, name, values[:, column:column + 1])
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self, index):
+        return CompiledParamMatrix(self.values[index])
+
+def compile_param_matrix(params_list):
+    """Compiles and stacks parameter sets (dicts or CompiledParams) into a CompiledParamMatrix.
+
+    Each set goes through compile_params(), so the tier offsets are bit-identical to the
+    scalar path's. Raises ValueError if any set is invalid.
+    """
+    import numpy as np
+
+    compiled = [compile_params(params) for params in params_list]
+    values = np.array([[getattr(params, name) for name in CompiledParams.__slots__] for params in compiled],
+                      dtype=np.float64).reshape(len(compiled), len(CompiledParams.__slots__))
+    return CompiledParamMatrix(values)
+
+def calculate_reimbursement_matrix(trip_duration_days, miles_traveled, total_receipts_amount, param_matrix):
+    """Results of every parameter set in param_matrix for every trip, as a (K, N) array.
+
+    Trip inputs are 1-D arrays of length N; row k equals calculate_reimbursement_batch()
+    with the k-th parameter set, bit for bit. Everything is computed in one pass, so
+    callers bound K * N (see tune_parameters.MatrixEvaluator for chunked scoring).
+    """
+    import numpy as np
+
+    if not isinstance(param_matrix, CompiledParamMatrix):
+        param_matrix = compile_param_matrix(param_matrix)
+    days = np.asarray(trip_duration_days, dtype=np.float64).ravel()
+    miles = np.asarray(miles_traveled, dtype=np.float64).ravel()
+    receipts = np.asarray(total_receipts_amount, dtype=np.float64).ravel()
+    if not days.shape == miles.shape == receipts.shape:
+        raise ValueError("Trip input arrays must have the same length")
+
+    total_reimbursement = np.empty((len(param_matrix), days.shape[0]), dtype=np.float64)
+    _calculate_reimbursement_block(np, days, miles, receipts, param_matrix, total_reimbursement)
     return total_reimbursement
 
+# Trips computed and written per chunk by run_batch; bounds memory for arbitrarily large inputs.
+BATCH_OUTPUT_CHUNK_SIZE = 4096
+
+def _trip_calculator(params, cache):
+    """Function mapping a list of (days, miles, receipts) trips to results, through cache if given."""
+    if cache is None:
+        return lambda trips: [calculate_reimbursement(days, miles, receipts, params) for days, miles, receipts in trips]
+    from result_cache import CachedCalculation
+    return CachedCalculation(cache, calculate_reimbursement, params).calculate_many
+
+def run_batch(input_stream, output_stream, fmt=None, params=COMPILED_DEFAULT_PARAMS, chunk_size=BATCH_OUTPUT_CHUNK_SIZE, cache=None):
+    """Streams trips from input_stream and writes one result per line to output_stream.
+
+    fmt is "json", "ndjson" or "csv" (see trip_io); None auto-detects it. Each result uses
+    the single-trip CLI's formatting; malformed trips produce an ERROR line, like
+    generate_results.sh. cache is an optional result_cache.ResultCache to read and fill.
+    Returns the number of ERROR lines written.
+    """
+    from trip_io import iter_records, iter_chunks, parse_trip
+
+    params = compile_params(params)
+    calculate_trips = _trip_calculator(params, cache)
+    error_count = 0
+    trip_number = 0
+    for chunk in iter_chunks(iter_records(input_stream, fmt), chunk_size):
+        trips = []
+        output_lines = []
+        for record in chunk:
+            trip_number += 1
+            try:
+                trips.append(parse_trip(record))
+                output_lines.append(None) # Filled in once the chunk's trips are computed
+            except (KeyError, ValueError, TypeError, ArithmeticError) as e: # ArithmeticError: e.g. int(inf) days
+                print(f"Error on trip {trip_number}: {e!r}. Record: {record}", file=sys.stderr)
+                output_lines.append("ERROR")
+                error_count += 1
+        results = iter(calculate_trips(trips))
+        output_lines = [f"{next(results):.2f}" if line is None else line for line in output_lines]
+        output_lines.append("")
+        output_stream.write("\n".join(output_lines))
+    output_stream.flush()
+    return error_count
+
+def run_batch_store(store, output_stream, params=COMPILED_DEFAULT_PARAMS, chunk_size=BATCH_OUTPUT_CHUNK_SIZE, cache=None):
+    """run_batch for a memory-mapped CaseStore (see case_store.py); its trips are always well-formed."""
+    params = compile_params(params)
+    calculate_trips = _trip_calculator(params, cache)
+    for start in range(0, len(store), chunk_size):
+        stop = min(start + chunk_size, len(store))
+        trips = [(days, miles_hundredths / 100, receipts_cents / 100)
+                 for days, miles_hundredths, receipts_cents in zip(store.days[start:stop],
+                                                                   store.miles_hundredths[start:stop],
+                                                                   store.receipts_cents[start:stop])]
+        output_lines = [f"{result:.2f}" for result in calculate_trips(trips)]
+        output_lines.append("")
+        output_stream.write("\n".join(output_lines))
+    output_stream.flush()
+    return 0
+
+def _open_batch_store(input_path):
+    """The CaseStore to read instead of input_path: input_path itself if it is a store, else its fresh store, else None."""
+    from case_store import MAGIC, CaseStore, open_store
+
+    with open(input_path, "rb") as input_file:
+        if input_file.read(len(MAGIC)) == MAGIC:
+            return CaseStore(input_path)
+    return open_store(input_path)
+
+def _batch_main(args):
+    """Handles: --batch [<input_file>|-] [--format json|ndjson|csv]
+
+    Without --format, a binary case store (or a fresh store next to a JSON input) is read instead.
+    """
+    fmt = None
+    if "--format" in args:
+        position = args.index("--format")
+        if position + 1 >= len(args):
+            print("Error: --format requires one of json, ndjson, csv", file=sys.stderr)
+            sys.exit(1)
+        fmt = args[position + 1]
+        args = args[:position] + args[position + 2:]
+    if len(args) > 1:
+        print(BATCH_USAGE, file=sys.stderr)
+        sys.exit(1)
+    input_path = args[0] if args else "-"
+
+    from result_cache import open_cache_from_environment
+    cache = open_cache_from_environment() # Opt-in: REIMBURSEMENT_CACHE=1 or a cache file path
+    try:
+        store = _open_batch_store(input_path) if input_path != "-" and fmt is None else None
+        if store is not None:
+            with store:
+                run_batch_store(store, sys.stdout, cache=cache)
+        elif input_path == "-":
+            run_batch(sys.stdin, sys.stdout, fmt, cache=cache)
+        else:
+            with open(input_path, "r") as input_file:
+                run_batch(input_file, sys.stdout, fmt, cache=cache)
+    except (OSError, ValueError) as e: # ValueError covers unknown formats and undecodable JSON
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+
+BATCH_USAGE = "Usage: python calculate_reimbursement.py --batch [<input_file>|-] [--format json|ndjson|csv]"
+
 if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--batch":
+        _batch_main(sys.argv[2:])
+        sys.exit(0)
+
     if len(sys.argv) != 4:
         print("Usage: python calculate_reimbursement.py <trip_duration_days> <miles_traveled> <total_receipts_amount>", file=sys.stderr)
+        print(f"   or: {BATCH_USAGE[len('Usage: '):]}", file=sys.stderr)
         sys.exit(1)
 
     try:
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import mmap
+import zlib
+import struct
+from array import array
+from itertools import repeat
+from decimal import Decimal
+
+# Columnar binary store for case files (public_cases.json, private_cases.json and larger dumps).
+# Parsing JSON dominates startup for big files; a store is written once by the converter
+# below and then memory-mapped, so loading costs one mmap and a header check.
+#
+# Layout (little-endian):
+#   header  HEADER_FORMAT: magic, schema version, flags, case count, size and mtime_ns of the
+#           source JSON, CRC-32 of the column data
+#   columns int64 miles_traveled in hundredths of a mile
+#           int64 total_receipts_amount in cents
+#           int64 expected_output in cents (only if FLAG_HAS_EXPECTED)
+#           int32 trip_duration_days
+#
+# Miles are stored in hundredths rather than whole miles because the case files contain
+# fractional mileages. Every value must have at most two decimal places; n / 100 then
+# yields exactly the float that parsing the original JSON text gives.
+#
+# A store is only used in place of its JSON file while the JSON's size and mtime still
+# match the header (see open_cases), so editing the JSON never serves stale data.
+
+MAGIC = b"TCCASES\0"
+SCHEMA_VERSION = 1
+HEADER_FORMAT = "<8sHHQQqI8x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FLAG_HAS_EXPECTED = 1
+STORE_SUFFIX = ".bin"
+SCALE = 100 # Stored integers are hundredths (cents for money amounts)
+
+def store_path_for(json_path):
+    """Binary store path used for a JSON case file: public_cases.json -> public_cases.bin."""
+    return os.path.splitext(json_path)[0] + STORE_SUFFIX
+
+def _to_hundredths(value, field_name, case_number):
+    scaled = Decimal(value) * SCALE
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Case {case_number}: {field_name} {value} has more than two decimal places")
+    return int(scaled)
+
+def convert_cases(json_path, store_path=None):
+    """Writes the binary store for a JSON case file and returns its path.
+
+    Accepts public-format cases ({"input": {...}, "expected_output": ...}) and bare trips,
+    as in private_cases.json. Raises ValueError for cases the schema cannot hold exactly.
+    """
+    store_path = store_path or store_path_for(json_path)
+    source_stat = os.stat(json_path)
+    with open(json_path, "r") as f:
+        cases = json.load(f, parse_float=Decimal)
+    if not isinstance(cases, list):
+        raise ValueError("JSON input must be an array of cases")
+
+    has_expected = bool(cases) and all(isinstance(case, dict) and "expected_output" in case for case in cases)
+    days, miles, receipts, expected = array("i"), array("q"), array("q"), array("q")
+    for case_number, case in enumerate(cases, start=1):
+        try:
+            trip = case.get("input", case)
+            trip_duration_days = trip["trip_duration_days"]
+            if isinstance(trip_duration_days, bool) or int(trip_duration_days) != trip_duration_days:
+                raise ValueError(f"Case {case_number}: trip_duration_days {trip_duration_days} is not an integer")
+            days.append(int(trip_duration_days))
+            miles.append(_to_hundredths(trip["miles_traveled"], "miles_traveled", case_number))
+            receipts.append(_to_hundredths(trip["total_receipts_amount"], "total_receipts_amount", case_number))
+            if has_expected:
+                expected.append(_to_hundredths(case["expected_output"], "expected_output", case_number))
+        except (KeyError, TypeError, AttributeError, OverflowError) as e:
+            raise ValueError(f"Case {case_number}: malformed case ({e!r})") from None
+
+    columns = [miles, receipts] + ([expected] if has_expected else []) + [days]
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+    checksum = 0
+    for column in columns:
+        checksum = zlib.crc32(column, checksum)
+    header = struct.pack(HEADER_FORMAT, MAGIC, SCHEMA_VERSION, FLAG_HAS_EXPECTED if has_expected else 0,
+                         len(days), source_stat.st_size, source_stat.st_mtime_ns, checksum)
+
+    temp_path = store_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        for column in columns:
+            column.tofile(f)
+    os.replace(temp_path, store_path) # Readers never see a half-written store
+    return store_path
+
+class CaseStore:
+    """Memory-mapped, read-only view of a binary case store.
+
+    days, miles_hundredths, receipts_cents and expected_cents (None without expected
+    outputs) are integer memoryviews straight over the mapping; nothing is copied.
+    """
+
+    def __init__(self, store_path, verify=True):
+        self.path = store_path
+        with open(store_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _load(self, verify):
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError(f"{self.path} is not a case store (file too short)")
+        magic, version, flags, count, self.source_size, self.source_mtime_ns, checksum = \
+            struct.unpack_from(HEADER_FORMAT, self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a case store (bad magic)")
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"{self.path} has schema version {version}, expected {SCHEMA_VERSION}; reconvert it")
+        self.count = count
+        self.has_expected = bool(flags & FLAG_HAS_EXPECTED)
+        int64_columns = 3 if self.has_expected else 2
+        data_size = count * (8 * int64_columns + 4)
+        if len(self._mmap) != HEADER_SIZE + data_size:
+            raise ValueError(f"{self.path} is truncated or has trailing data")
+
+        data = memoryview(self._mmap)[HEADER_SIZE:]
+        self._views = [data]
+        if verify and zlib.crc32(data) != checksum:
+            raise ValueError(f"{self.path} failed its checksum; reconvert it")
+
+        offset = 0
+        columns = []
+        for typecode, width in [("q", 8)] * int64_columns + [("i", 4)]:
+            columns.append(self._column(data[offset:offset + count * width], typecode))
+            offset += count * width
+        self.miles_hundredths, self.receipts_cents = columns[0], columns[1]
+        self.expected_cents = columns[2] if self.has_expected else None
+        self.days = columns[-1]
+
+    def _column(self, raw, typecode):
+        if sys.byteorder == "little":
+            view = raw.cast(typecode)
+            self._views.append(view)
+            return view
+        column = array(typecode, raw) # Big-endian hosts need a byte-swapped copy
+        column.byteswap()
+        return column
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yields (days, miles, receipts, expected) floats; expected is None without expected outputs."""
+        expected_cents = self.expected_cents if self.has_expected else repeat(None)
+        for days, miles, receipts, expected in zip(self.days, self.miles_hundredths, self.receipts_cents, expected_cents):
+            yield days, miles / SCALE, receipts / SCALE, (expected / SCALE if expected is not None else None)
+
+    def numpy_columns(self):
+        """(days, miles, receipts, expected) as float64 NumPy arrays (expected is None without outputs)."""
+        import numpy as np
+        def scaled(column):
+            return np.frombuffer(column, dtype=np.int64) / SCALE
+        expected = scaled(self.expected_cents) if self.has_expected else None
+        return (np.frombuffer(self.days, dtype=np.int32).astype(np.float64),
+                scaled(self.miles_hundredths), scaled(self.receipts_cents), expected)
+
+    def close(self):
+        """Releases the column views and unmaps the file."""
+        for view in reversed(getattr(self, "_views", [])):
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def fresh_store_path(json_path):
+    """Path of json_path's binary store if it exists and still matches the JSON file, else None."""
+    store_path = store_path_for(json_path)
+    if store_path == json_path or not os.path.exists(store_path):
+        return None
+    try:
+        json_stat = os.stat(json_path)
+    except FileNotFoundError:
+        return store_path # Only the store is left; it is the sole copy of the cases
+    try:
+        with open(store_path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        magic, version, _, _, source_size, source_mtime_ns, _ = struct.unpack(HEADER_FORMAT, header)
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or version != SCHEMA_VERSION:
+        return None
+    if (source_size, source_mtime_ns) != (json_stat.st_size, json_stat.st_mtime_ns):
+        return None
+    return store_path
+
+def open_store(json_path):
+    """Opens json_path's store if it is fresh and valid, returning None otherwise."""
+    store_path = fresh_store_path(json_path)
+    if store_path is None:
+        return None
+    try:
+        return CaseStore(store_path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring case store {store_path}: {e}", file=sys.stderr)
+        return None
+
+def open_cases(json_path):
+    """Cases for json_path: a CaseStore when a fresh store exists, else the parsed JSON list."""
+    store = open_store(json_path)
+    if store is not None:
+        return store
+    with open(json_path, "r") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python case_store.py <cases.json> [<output.bin>]", file=sys.stderr)
+        sys.exit(1)
+    try:
+        output_path = convert_cases(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
+    except (OSError, ValueError) as e: # ValueError covers undecodable JSON and unstorable cases
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with CaseStore(output_path) as store:
+        print(f"Wrote {len(store)} cases to {output_path}")
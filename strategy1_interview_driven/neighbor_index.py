@@ -0,0 +1,245 @@
+import os
+import sys
+import math
+import heapq
+import argparse
+
+# Nearest-neighbour queries over historical cases, for residual analysis ("which trips look
+# like this bad case, and what were they paid?") and for an optional residual correction of
+# calculate_reimbursement's output.
+#
+# Trips are points in scaled (days, miles, receipts) space: each coordinate is divided by
+# its standard deviation over the indexed cases, so no dimension dominates the distance.
+# Points are bucketed into a uniform grid of cubic cells sized for about
+# TARGET_POINTS_PER_CELL points per occupied cell. Building is a single O(n) pass; a
+# k-nearest query scans rings of cells outward from the query's cell and stops as soon as
+# no unscanned cell can hold a closer point, so it touches a handful of cells regardless
+# of how many cases are indexed.
+
+from calculate_reimbursement import calculate_reimbursement, compile_params, COMPILED_DEFAULT_PARAMS
+from trip_io import parse_trip
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PUBLIC_CASES_JSON_PATH = os.path.join(os.path.dirname(SCRIPT_DIR), "public_cases.json")
+
+TARGET_POINTS_PER_CELL = 8
+DEFAULT_K = 5
+# Residual correction weights neighbours by 1 / (distance + this), in scaled units;
+# keeps exact duplicates (distance 0) finite while still letting them dominate.
+CORRECTION_DISTANCE_OFFSET = 0.05
+
+def iter_cases(test_cases):
+    """Yields (days, miles, receipts, expected) from public-format case dicts or a CaseStore."""
+    if hasattr(test_cases, "receipts_cents"): # case_store.CaseStore rows are already in this form
+        yield from test_cases
+        return
+    for case in test_cases:
+        yield parse_trip(case) + (float(case["expected_output"]),)
+
+class NeighborIndex:
+    """Uniform-grid index answering k-nearest and radius queries over scaled trips."""
+
+    def __init__(self, trips, scales=None, cell_size=None):
+        """trips is a sequence of (days, miles, receipts); query results refer to positions in it.
+
+        scales divides each coordinate (default: its standard deviation over trips);
+        cell_size is the grid spacing in scaled units (default: sized from the point density).
+        """
+        trips = [(float(days), float(miles), float(receipts)) for days, miles, receipts in trips]
+        if not trips:
+            raise ValueError("Cannot build a neighbour index without trips")
+        self.scales = tuple(scales) if scales is not None else self._default_scales(trips)
+        if len(self.scales) != 3 or not all(scale > 0 for scale in self.scales):
+            raise ValueError("scales must be three positive numbers")
+        self.points = [self._scale(trip) for trip in trips]
+        self.cell_size = cell_size if cell_size is not None else self._default_cell_size(self.points)
+
+        self._cells = {}
+        for index, point in enumerate(self.points):
+            self._cells.setdefault(self._cell_of(point), []).append(index)
+        self._cell_min = tuple(min(cell[axis] for cell in self._cells) for axis in range(3))
+        self._cell_max = tuple(max(cell[axis] for cell in self._cells) for axis in range(3))
+
+    @staticmethod
+    def _default_scales(trips):
+        scales = []
+        for axis in range(3):
+            values = [trip[axis] for trip in trips]
+            mean = sum(values) / len(values)
+            std = math.sqrt(sum((value - mean) ** 2 for value in values) / len(values))
+            scales.append(std if std > 0 else 1.0)
+        return tuple(scales)
+
+    @staticmethod
+    def _default_cell_size(points):
+        extents = [max(point[axis] for point in points) - min(point[axis] for point in points) for axis in range(3)]
+        volume = 1.0
+        for extent in extents:
+            volume *= max(extent, 1e-9)
+        return max((volume * TARGET_POINTS_PER_CELL / len(points)) ** (1.0 / 3.0), 1e-9)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _scale(self, trip):
+        return (trip[0] / self.scales[0], trip[1] / self.scales[1], trip[2] / self.scales[2])
+
+    def _cell_of(self, point):
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size),
+                math.floor(point[2] / self.cell_size))
+
+    def _ring(self, center, ring):
+        """Occupied-range cells at Chebyshev distance exactly ring from center."""
+        ranges = [range(max(center[axis] - ring, self._cell_min[axis]), min(center[axis] + ring, self._cell_max[axis]) + 1)
+                  for axis in range(3)]
+        for x in ranges[0]:
+            x_edge = abs(x - center[0]) == ring
+            for y in ranges[1]:
+                if x_edge or abs(y - center[1]) == ring:
+                    for z in ranges[2]:
+                        yield (x, y, z)
+                elif center[2] - ring >= self._cell_min[2]:
+                    yield (x, y, center[2] - ring)
+                    if ring and center[2] + ring <= self._cell_max[2]:
+                        yield (x, y, center[2] + ring)
+                elif center[2] + ring <= self._cell_max[2]:
+                    yield (x, y, center[2] + ring)
+
+    def _ring_range(self, center):
+        """First and last rings around center that intersect the occupied cells."""
+        first = max(max(self._cell_min[axis] - center[axis], center[axis] - self._cell_max[axis], 0) for axis in range(3))
+        last = max(max(abs(center[axis] - self._cell_min[axis]), abs(center[axis] - self._cell_max[axis]))
+                   for axis in range(3))
+        return first, last
+
+    def nearest(self, days, miles, receipts, k=DEFAULT_K, exclude=None):
+        """The k nearest indexed trips as (distance, index) pairs, closest first.
+
+        Distances are Euclidean in scaled units. exclude is an index to skip, e.g. the
+        query's own case for leave-one-out analysis.
+        """
+        if k <= 0:
+            return []
+        query = self._scale((days, miles, receipts))
+        center = self._cell_of(query)
+        best = [] # Max-heap of (-squared distance, -index) holding the k closest so far
+        first_ring, last_ring = self._ring_range(center)
+        for ring in range(first_ring, last_ring + 1):
+            if ring > 1 and len(best) == k and ((ring - 1) * self.cell_size) ** 2 > -best[0][0]:
+                break # Every point in this ring or beyond is at least (ring - 1) cells away
+            for cell in self._ring(center, ring):
+                for index in self._cells.get(cell, ()):
+                    if index == exclude:
+                        continue
+                    point = self.points[index]
+                    squared = (point[0] - query[0]) ** 2 + (point[1] - query[1]) ** 2 + (point[2] - query[2]) ** 2
+                    if len(best) < k:
+                        heapq.heappush(best, (-squared, -index))
+                    elif (-squared, -index) > best[0]:
+                        heapq.heapreplace(best, (-squared, -index))
+        return [(math.sqrt(-neg_squared), -neg_index) for neg_squared, neg_index in sorted(best, reverse=True)]
+
+    def within(self, days, miles, receipts, radius, exclude=None):
+        """All indexed trips within radius (scaled units) as (distance, index) pairs, closest first."""
+        query = self._scale((days, miles, receipts))
+        center = self._cell_of(query)
+        squared_radius = radius * radius
+        matches = []
+        first_ring, last_ring = self._ring_range(center)
+        for ring in range(first_ring, min(math.ceil(radius / self.cell_size) + 1, last_ring) + 1):
+            for cell in self._ring(center, ring):
+                for index in self._cells.get(cell, ()):
+                    point = self.points[index]
+                    squared = (point[0] - query[0]) ** 2 + (point[1] - query[1]) ** 2 + (point[2] - query[2]) ** 2
+                    if squared <= squared_radius and index != exclude:
+                        matches.append((squared, index))
+        matches.sort()
+        return [(math.sqrt(squared), index) for squared, index in matches]
+
+class ResidualCorrector:
+    """calculate_reimbursement plus a distance-weighted mean of its neighbours' residuals.
+
+    A case's residual is expected_output - calculate_reimbursement(case, params); a query
+    is corrected by the weighted residuals of its k nearest indexed cases.
+    """
+
+    def __init__(self, test_cases, params=COMPILED_DEFAULT_PARAMS, k=DEFAULT_K, index=None):
+        self.params = compile_params(params)
+        self.k = k
+        cases = list(iter_cases(test_cases))
+        self.trips = [(days, miles, receipts) for days, miles, receipts, _ in cases]
+        self.expected = [expected for _, _, _, expected in cases]
+        self.residuals = [expected - calculate_reimbursement(days, miles, receipts, self.params)
+                          for days, miles, receipts, expected in cases]
+        self.index = index if index is not None else NeighborIndex(self.trips)
+
+    def correction(self, days, miles, receipts, exclude=None):
+        """Weighted mean residual of the k nearest cases (0.0 if there are none)."""
+        total_weight = 0.0
+        weighted_residuals = 0.0
+        for distance, index in self.index.nearest(days, miles, receipts, self.k, exclude=exclude):
+            weight = 1.0 / (distance + CORRECTION_DISTANCE_OFFSET)
+            total_weight += weight
+            weighted_residuals += weight * self.residuals[index]
+        return weighted_residuals / total_weight if total_weight else 0.0
+
+    def predict(self, days, miles, receipts, exclude=None):
+        """calculate_reimbursement's result adjusted by correction()."""
+        return calculate_reimbursement(days, miles, receipts, self.params) + self.correction(days, miles, receipts, exclude)
+
+    def leave_one_out_errors(self):
+        """(uncorrected, corrected) average absolute error, predicting each case from the others."""
+        uncorrected = sum(abs(residual) for residual in self.residuals) / len(self.residuals)
+        corrected = sum(abs(expected - self.predict(*trip, exclude=index))
+                        for index, (trip, expected) in enumerate(zip(self.trips, self.expected))) / len(self.trips)
+        return uncorrected, corrected
+
+def load_cases(cases_path):
+    """Cases from a JSON file, via its binary case store when a fresh one exists."""
+    from case_store import open_cases
+    return open_cases(cases_path)
+
+def _print_neighbors(corrector, matches):
+    for distance, index in matches:
+        days, miles, receipts = corrector.trips[index]
+        print(f"  #{index + 1}: {int(days)} days, {miles:g} miles, ${receipts:.2f} receipts -> "
+              f"expected {corrector.expected[index]:.2f}, residual {corrector.residuals[index]:+.2f} (distance {distance:.4f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nearest-neighbour queries and residual correction over historical cases.")
+    parser.add_argument("--cases", default=PUBLIC_CASES_JSON_PATH, help="Cases file in public_cases.json format")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Number of neighbours")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("nearest", "List the k nearest cases to a trip"),
+                            ("predict", "Print the residual-corrected reimbursement for a trip")):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument("trip_duration_days", type=int)
+        subparser.add_argument("miles_traveled", type=float)
+        subparser.add_argument("total_receipts_amount", type=float)
+    radius_parser = subparsers.add_parser("radius", help="List the cases within a scaled distance of a trip")
+    radius_parser.add_argument("trip_duration_days", type=int)
+    radius_parser.add_argument("miles_traveled", type=float)
+    radius_parser.add_argument("total_receipts_amount", type=float)
+    radius_parser.add_argument("radius", type=float)
+    subparsers.add_parser("evaluate", help="Leave-one-out average error with and without residual correction")
+    args = parser.parse_args()
+
+    try:
+        corrector = ResidualCorrector(load_cases(args.cases), k=args.k)
+    except (OSError, ValueError, KeyError, TypeError) as e: # ValueError also covers undecodable JSON
+        print(f"Error: Could not load cases from {args.cases}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    trip = None if args.command == "evaluate" else \
+        (args.trip_duration_days, args.miles_traveled, args.total_receipts_amount)
+    if args.command == "nearest":
+        _print_neighbors(corrector, corrector.index.nearest(*trip, k=args.k))
+    elif args.command == "radius":
+        _print_neighbors(corrector, corrector.index.within(*trip, args.radius))
+    elif args.command == "predict":
+        print(f"{corrector.predict(*trip):.2f}")
+    else:
+        uncorrected, corrected = corrector.leave_one_out_errors()
+        print(f"Leave-one-out average error over {len(corrector.trips)} cases (k={args.k}):")
+        print(f"  calculate_reimbursement: {uncorrected:.4f}")
+        print(f"  with residual correction: {corrected:.4f}")
@@ -0,0 +1,101 @@
+/*
+ * Thin client for reimbursement_server.py, used by run.sh when the server's socket exists.
+ * A Python client pays for a cold interpreter start per call, which is what the server is
+ * there to avoid; this one starts in about a millisecond. run.sh compiles it on first use.
+ *
+ * Usage: reimbursement_client <socket_path> <trip_duration_days> <miles_traveled> <total_receipts_amount>
+ *
+ * Prints the server's answer and exits 0, or exits 1 (printing nothing) so run.sh falls
+ * back to running calculate_reimbursement.py directly. The answer is only trusted if the
+ * process listening on the socket runs as our own user.
+ */
+#define _GNU_SOURCE
+#include <stdio.h>
+#include <string.h>
+#include <sys/socket.h>
+#include <sys/time.h>
+#include <sys/types.h>
+#include <sys/un.h>
+#include <unistd.h>
+
+#define TIMEOUT_SECONDS 5
+#define MAX_REQUEST 256
+#define MAX_RESPONSE 64
+
+static int peer_is_same_user(int fd)
+{
+#ifdef SO_PEERCRED
+    struct ucred credentials;
+    socklen_t length = sizeof(credentials);
+    if (getsockopt(fd, SOL_SOCKET, SO_PEERCRED, &credentials, &length) != 0)
+        return 0;
+    return credentials.uid == getuid();
+#else
+    uid_t uid;
+    gid_t gid;
+    if (getpeereid(fd, &uid, &gid) != 0)
+        return 0;
+    return uid == getuid();
+#endif
+}
+
+static int request(const char *socket_path, const char *line, size_t line_length, char *response)
+{
+    struct sockaddr_un address;
+    struct timeval timeout = { TIMEOUT_SECONDS, 0 };
+    size_t received = 0;
+    ssize_t count;
+    int fd;
+
+    if (strlen(socket_path) >= sizeof(address.sun_path))
+        return -1;
+    memset(&address, 0, sizeof(address));
+    address.sun_family = AF_UNIX;
+    strcpy(address.sun_path, socket_path);
+
+    fd = socket(AF_UNIX, SOCK_STREAM, 0);
+    if (fd < 0)
+        return -1;
+    setsockopt(fd, SOL_SOCKET, SO_RCVTIMEO, &timeout, sizeof(timeout));
+    setsockopt(fd, SOL_SOCKET, SO_SNDTIMEO, &timeout, sizeof(timeout));
+    if (connect(fd, (struct sockaddr *)&address, sizeof(address)) != 0 || !peer_is_same_user(fd)
+        || write(fd, line, line_length) != (ssize_t)line_length) {
+        close(fd);
+        return -1;
+    }
+    shutdown(fd, SHUT_WR);
+    while (received < MAX_RESPONSE - 1 && (received == 0 || response[received - 1] != '\n')) {
+        count = read(fd, response + received, MAX_RESPONSE - 1 - received);
+        if (count <= 0)
+            break;
+        received += (size_t)count;
+    }
+    close(fd);
+    response[received] = '\0';
+    return (int)received;
+}
+
+int main(int argc, char **argv)
+{
+    char line[MAX_REQUEST];
+    char response[MAX_RESPONSE];
+    int length, i;
+
+    if (argc != 5) {
+        fprintf(stderr, "Usage: reimbursement_client <socket_path> <trip_duration_days> <miles_traveled> <total_receipts_amount>\n");
+        return 1;
+    }
+    for (i = 2; i < 5; i++) {
+        if (argv[i][0] == '\0' || strpbrk(argv[i], " \t\r\n\v\f") != NULL)
+            return 1; /* Would not survive the whitespace-separated protocol; let the CLI handle it */
+    }
+    length = snprintf(line, sizeof(line), "%s %s %s\n", argv[2], argv[3], argv[4]);
+    if (length < 0 || length >= (int)sizeof(line))
+        return 1;
+
+    length = request(argv[1], line, (size_t)length, response);
+    if (length <= 1 || response[length - 1] != '\n' || strcmp(response, "ERROR\n") == 0)
+        return 1;
+    fputs(response, stdout);
+    return 0;
+}
@@ -0,0 +1,165 @@
+import sys
+import os
+import stat
+import signal
+import socket
+import threading
+import importlib.util
+import socketserver
+
+# Resident reimbursement server. Keeps calculate_reimbursement imported in one long-lived
+# process and answers requests on a local Unix socket, so ./run.sh does not pay for a cold
+# Python start per trip. run.sh talks to it through reimbursement_client.c and falls back to
+# running the script directly when no server is listening.
+#
+# The socket is created in a directory that only this user can write ($XDG_RUNTIME_DIR, or
+# /tmp/reimbursement-<uid> created with mode 0700), so other users can neither squat its path
+# nor connect; the client additionally checks that the server runs as the same user.
+#
+# Protocol (one request per line, any number of lines per connection):
+#   request:  "<trip_duration_days> <miles_traveled> <total_receipts_amount>\n"
+#   response: the CLI's output line (e.g. "686.65\n"), or "ERROR\n" when the CLI would fail.
+#             Clients treat ERROR as "run the CLI directly" so error messages and exit codes
+#             stay those of calculate_reimbursement.py.
+
+MODULE_NAME = "calculate_reimbursement"
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_PATH = os.path.join(MODULE_DIR, MODULE_NAME + ".py")
+
+SOCKET_NAME = "reimbursement.sock"
+
+def default_socket_path():
+    """Socket path shared with run.sh: $REIMBURSEMENT_SOCKET, else in $XDG_RUNTIME_DIR, else in /tmp/reimbursement-<uid>/."""
+    if os.environ.get("REIMBURSEMENT_SOCKET"):
+        return os.environ["REIMBURSEMENT_SOCKET"]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], SOCKET_NAME)
+    return os.path.join(f"/tmp/reimbursement-{os.getuid()}", SOCKET_NAME)
+
+def _prepare_socket_directory(socket_path):
+    """Creates the socket's directory (mode 0700) if needed and checks that no other user can write it."""
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise RuntimeError(f"{directory} must be a directory owned by this user and writable by no one else; "
+                           f"choose another socket path")
+
+if MODULE_DIR not in sys.path:
+    sys.path.insert(0, MODULE_DIR)
+
+def _load_module(module_path):
+    """Executes module_path as a new, independent module object (not registered in sys.modules)."""
+    spec = importlib.util.spec_from_file_location(MODULE_NAME, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class CalculationModule:
+    """Holds the loaded calculation module and reloads it when its file changes on disk.
+
+    A reload executes the file as a fresh module and then replaces the single reference to
+    it, so requests already running keep using the old module, untouched, until they finish.
+    """
+
+    def __init__(self, module_path=MODULE_PATH):
+        self._module_path = module_path
+        self._lock = threading.Lock()
+        self._mtime_ns = os.stat(module_path).st_mtime_ns
+        self._module = _load_module(module_path)
+
+    def current(self):
+        """Returns the up-to-date module, reloading it (and DEFAULT_PARAMS) if the file changed."""
+        try:
+            mtime_ns = os.stat(self._module_path).st_mtime_ns
+        except OSError:
+            return self._module # File briefly missing (e.g. mid-save): keep serving the last good version
+        if mtime_ns != self._mtime_ns:
+            with self._lock:
+                if mtime_ns != self._mtime_ns:
+                    try:
+                        self._module = _load_module(self._module_path)
+                        print(f"Reloaded {self._module_path}", file=sys.stderr)
+                    except Exception as e:
+                        print(f"Error reloading {self._module_path}, keeping previous version: {e}", file=sys.stderr)
+                    self._mtime_ns = mtime_ns
+        return self._module
+
+def format_response(module, request_line):
+    """Computes the CLI's output for one request line, or ERROR if the CLI would reject it."""
+    args = request_line.split()
+    if len(args) != 3:
+        return "ERROR"
+    try:
+        # Same conversions and formatting as calculate_reimbursement.py's __main__ block
+        trip_duration_days = int(args[0])
+        miles_traveled = float(args[1])
+        total_receipts_amount = float(args[2])
+        reimbursement = module.calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount)
+        return f"{reimbursement:.2f}"
+    except Exception:
+        return "ERROR"
+
+class ReimbursementRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw_line in self.rfile:
+            module = self.server.calculation_module.current()
+            response = format_response(module, raw_line.decode("utf-8", errors="replace"))
+            self.wfile.write(response.encode("ascii") + b"\n")
+            self.wfile.flush()
+
+class ReimbursementServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True # Each connection gets its own thread; don't block shutdown on them
+
+    def __init__(self, socket_path, calculation_module):
+        self.calculation_module = calculation_module
+        super().__init__(socket_path, ReimbursementRequestHandler)
+
+def _remove_stale_socket(socket_path):
+    """Deletes a leftover socket file unless another server is still answering on it."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise RuntimeError(f"A server is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+def serve(socket_path=None):
+    """Runs the server in the foreground until SIGINT/SIGTERM."""
+    socket_path = socket_path or default_socket_path()
+    _prepare_socket_directory(socket_path)
+    _remove_stale_socket(socket_path)
+    server = ReimbursementServer(socket_path, CalculationModule())
+    os.chmod(socket_path, 0o600)
+
+    def _shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    print(f"Serving reimbursements on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print("Usage: python reimbursement_server.py [<socket_path>]", file=sys.stderr)
+        sys.exit(1)
+    try:
+        serve(sys.argv[1] if len(sys.argv) == 2 else None)
+    except (OSError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+from contextlib import contextmanager
+
+# Persistent on-disk cache of calculate_reimbursement results, shared between processes.
+#
+# Entries are keyed by a parameter fingerprint (a hash of the parameter dict and of the
+# calculation code) plus the trip as integers: (days, miles in hundredths, receipts in
+# cents), as in case_store.py. Trips whose values are not whole hundredths bypass the cache.
+#
+# The file is a fixed-size, memory-mapped, set-associative hash table: a key hashes to one
+# bucket of BUCKET_WAYS slots, so a lookup or insert touches at most that many slots. When
+# a bucket is full, the least recently used slot in it is overwritten, which bounds the file
+# at the size chosen when it was created. Entries of outdated parameter sets are never hit
+# again and age out the same way; a change to the calculation code (its source hash is in
+# the header) clears the whole table on open.
+#
+# Writers serialize on an flock of the file. Readers take no lock: every slot carries a
+# check value over its contents, and a slot caught mid-write reads as a miss.
+
+MAGIC = b"TCRCACHE"
+SCHEMA_VERSION = 1
+HEADER_FORMAT = "<8sHH4xQ32sQ" # magic, schema version, ways, bucket count, code version, LRU clock
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+CLOCK_OFFSET = HEADER_SIZE - 8
+SLOT_FORMAT = "<QqqqdQQ" # fingerprint, days, miles hundredths, receipt cents, result, last used, check
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+BUCKET_WAYS = 8
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+MASK64 = (1 << 64) - 1
+SCALE = 100
+
+CALCULATION_MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calculate_reimbursement.py")
+
+def default_cache_path():
+    """Cache file used when REIMBURSEMENT_CACHE is set to "1": /tmp/reimbursement-cache-<uid>.bin."""
+    return f"/tmp/reimbursement-cache-{os.getuid()}.bin"
+
+def cache_path_from_environment():
+    """Cache path requested through $REIMBURSEMENT_CACHE ("1" for the default path), or None."""
+    setting = os.environ.get("REIMBURSEMENT_CACHE", "")
+    if setting in ("", "0"):
+        return None
+    return default_cache_path() if setting == "1" else setting
+
+def code_version(module_path=CALCULATION_MODULE_PATH):
+    """SHA-256 of the calculation module's source; results computed by other versions are discarded."""
+    with open(module_path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+def params_fingerprint(params, version):
+    """Stable, nonzero 64-bit fingerprint of a parameter dict (or CompiledParams) and a code version."""
+    if hasattr(params, "as_dict"):
+        params = params.as_dict()
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    fingerprint = int.from_bytes(hashlib.sha256(version + canonical).digest()[:8], "little")
+    return fingerprint or 1 # 0 marks empty slots
+
+def trip_key(trip_duration_days, miles_traveled, total_receipts_amount):
+    """(days, miles hundredths, receipt cents), or None when the trip has no exact integer form."""
+    if not isinstance(trip_duration_days, int):
+        return None
+    try:
+        miles_hundredths = round(miles_traveled * SCALE)
+        receipts_cents = round(total_receipts_amount * SCALE)
+    except (OverflowError, ValueError): # inf / nan
+        return None
+    if miles_hundredths / SCALE != miles_traveled or receipts_cents / SCALE != total_receipts_amount:
+        return None
+    if not all(-(1 << 63) <= value < (1 << 63) for value in (trip_duration_days, miles_hundredths, receipts_cents)):
+        return None
+    return trip_duration_days, miles_hundredths, receipts_cents
+
+# Odd 64-bit multipliers for _mix(); hash() of ints and floats is the same in every process
+# and Python version, unlike hash() of tuples, so the mix is stable across both.
+_MIX_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD)
+
+def _mix(*values):
+    mixed = 0
+    for value, multiplier in zip(values, _MIX_MULTIPLIERS):
+        mixed = ((mixed ^ hash(value)) * multiplier) & MASK64
+    return mixed ^ (mixed >> 29)
+
+def _read_header(fd):
+    """(bucket count, code version) from an open cache file, or None if it is not a usable cache."""
+    header = os.pread(fd, HEADER_SIZE, 0)
+    if len(header) != HEADER_SIZE:
+        return None
+    magic, version, ways, num_buckets, code, _ = struct.unpack(HEADER_FORMAT, header)
+    if (magic, version, ways) != (MAGIC, SCHEMA_VERSION, BUCKET_WAYS) or num_buckets == 0 or \
+            os.fstat(fd).st_size != HEADER_SIZE + num_buckets * BUCKET_WAYS * SLOT_SIZE:
+        return None
+    return num_buckets, code
+
+def _create_table(path, num_buckets, version):
+    """Writes an empty table and swaps it in; processes still mapping the old file keep a private copy."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, SCHEMA_VERSION, BUCKET_WAYS, num_buckets, version, 0))
+        f.truncate(HEADER_SIZE + num_buckets * BUCKET_WAYS * SLOT_SIZE) # Sparse zeros: every slot empty
+    os.chmod(temp_path, 0o600)
+    os.replace(temp_path, path)
+
+class ResultCache:
+    """Memory-mapped result table; see the module comment for the layout and eviction policy."""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        import fcntl # Unix only, like the rest of the resident tooling
+        self._fcntl = fcntl
+        self.path = path
+        self.version = version if version is not None else code_version()
+
+        num_buckets = max(1, (max_bytes - HEADER_SIZE) // (BUCKET_WAYS * SLOT_SIZE))
+        for _ in range(2):
+            try:
+                self._fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                header = None
+            else:
+                header = _read_header(self._fd)
+                if header is not None and header[1] == self.version:
+                    break
+                os.close(self._fd)
+            # Missing, damaged or written by another version of the calculation code
+            _create_table(path, num_buckets, self.version)
+        else:
+            raise ValueError(f"{path} could not be initialized as a result cache")
+
+        self._num_buckets = header[0]
+        try:
+            self._mmap = mmap.mmap(self._fd, HEADER_SIZE + self._num_buckets * BUCKET_WAYS * SLOT_SIZE)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    @contextmanager
+    def _locked(self):
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+
+    def _bucket_offset(self, fingerprint, key):
+        return HEADER_SIZE + (_mix(fingerprint, *key) % self._num_buckets) * BUCKET_WAYS * SLOT_SIZE
+
+    def get(self, fingerprint, key):
+        """Cached result for (fingerprint, trip key), or None."""
+        offset = self._bucket_offset(fingerprint, key)
+        for slot_offset in range(offset, offset + BUCKET_WAYS * SLOT_SIZE, SLOT_SIZE):
+            slot_fingerprint, days, miles_hundredths, receipts_cents, value, _, check = \
+                struct.unpack_from(SLOT_FORMAT, self._mmap, slot_offset)
+            if slot_fingerprint == fingerprint and (days, miles_hundredths, receipts_cents) == key:
+                if check != _mix(fingerprint, days, miles_hundredths, receipts_cents, value):
+                    return None # Torn by a concurrent writer
+                clock, = struct.unpack_from("<Q", self._mmap, CLOCK_OFFSET)
+                struct.pack_into("<Q", self._mmap, slot_offset + SLOT_SIZE - 16, clock) # Refresh last used
+                return value
+        return None
+
+    def put_many(self, fingerprint, items):
+        """Stores (trip key, result) pairs under one lock, evicting each bucket's LRU slot when full."""
+        if not items:
+            return
+        with self._locked():
+            clock, = struct.unpack_from("<Q", self._mmap, CLOCK_OFFSET)
+            for key, value in items:
+                clock += 1
+                offset = self._bucket_offset(fingerprint, key)
+                victim_offset, victim_last_used = None, None
+                for slot_offset in range(offset, offset + BUCKET_WAYS * SLOT_SIZE, SLOT_SIZE):
+                    slot_fingerprint, days, miles_hundredths, receipts_cents, _, last_used, _ = \
+                        struct.unpack_from(SLOT_FORMAT, self._mmap, slot_offset)
+                    if slot_fingerprint == fingerprint and (days, miles_hundredths, receipts_cents) == key:
+                        victim_offset = slot_offset # Same key: overwrite in place
+                        break
+                    if slot_fingerprint == 0:
+                        last_used = -1 # Empty slots are used first
+                    if victim_last_used is None or last_used < victim_last_used:
+                        victim_offset, victim_last_used = slot_offset, last_used
+                struct.pack_into(SLOT_FORMAT, self._mmap, victim_offset, fingerprint, *key, value, clock,
+                                 _mix(fingerprint, *key, value))
+            struct.pack_into("<Q", self._mmap, CLOCK_OFFSET, clock)
+
+    def put(self, fingerprint, key, value):
+        self.put_many(fingerprint, [(key, value)])
+
+    def close(self):
+        self._mmap.close()
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CachedCalculation:
+    """calculate_reimbursement for one parameter set, reading and filling a ResultCache."""
+
+    def __init__(self, cache, calculate, params):
+        self.cache = cache
+        self.calculate = calculate
+        self.params = params
+        self.fingerprint = params_fingerprint(params, cache.version)
+        self.hits = 0
+        self.misses = 0
+
+    def calculate_many(self, trips):
+        """Results for a list of (days, miles, receipts) trips; misses are computed and stored in one write."""
+        results = []
+        new_entries = []
+        for trip in trips:
+            key = trip_key(*trip)
+            value = self.cache.get(self.fingerprint, key) if key is not None else None
+            if value is None:
+                value = self.calculate(*trip, self.params)
+                self.misses += 1
+                if key is not None:
+                    new_entries.append((key, value))
+            else:
+                self.hits += 1
+            results.append(value)
+        self.cache.put_many(self.fingerprint, new_entries)
+        return results
+
+def open_cache_from_environment():
+    """ResultCache at $REIMBURSEMENT_CACHE, or None when unset or unusable (a warning is printed)."""
+    path = cache_path_from_environment()
+    if path is None:
+        return None
+    try:
+        return ResultCache(path)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Warning: result cache {path} unavailable, computing without it: {e}", file=sys.stderr)
+        return None
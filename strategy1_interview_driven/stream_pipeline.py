@@ -0,0 +1,247 @@
+import sys
+import argparse
+from collections import deque
+
+# Chunked streaming pipeline for trip datasets of any size:
+#
+#   reader   trip_io.iter_records pulls raw records from the input a block at a time,
+#            or a CaseStore is sliced directly (see case_store.py)
+#   chunker  groups records into fixed-size chunks
+#   compute  parses each chunk and runs the kernel over it, inline or in a thread/process
+#            pool; at most max_in_flight chunks are outstanding and results are taken in
+#            submission order, so output order matches input order
+#   sink     writes one line per trip (as calculate_reimbursement.py --batch does) and folds
+#            each chunk into StreamMetrics, which keeps eval.sh's metrics online
+#
+# Nothing is retained per trip, so memory is bounded by chunk_size * (max_in_flight + 1)
+# records whatever the input size. Errors are kept in integer cents: outputs are printed
+# with two decimals and case files hold cents, so the totals are exact over any number of
+# trips and agree with evaluate.py's Decimal arithmetic.
+
+from calculate_reimbursement import calculate_reimbursement
+from trip_io import FORMATS, iter_records, iter_chunks, parse_trip
+
+DEFAULT_CHUNK_SIZE = 4096
+IN_FLIGHT_CHUNKS_PER_WORKER = 2 # Keeps every worker busy while the sink drains results
+EXACT_MATCH_CENTS = 1 # Same thresholds as eval.sh: error < $0.01 and error < $1.00
+CLOSE_MATCH_CENTS = 100
+EXECUTORS = ("thread", "process")
+
+class ChunkResult:
+    """Outcome of one chunk: output lines plus what the metrics need, in input order."""
+
+    __slots__ = ("first_number", "lines", "scored", "errors")
+
+    def __init__(self, first_number, lines, scored, errors):
+        self.first_number = first_number # 1-based trip number of the chunk's first record
+        self.lines = lines # "%.2f" result or "ERROR" per record
+        self.scored = scored # (trip number, trip, expected cents, actual cents) for records with expected outputs
+        self.errors = errors # (trip number, message) for records that could not be computed
+
+def _expected_cents(record):
+    if isinstance(record, dict) and "expected_output" in record:
+        return round(float(record["expected_output"]) * 100)
+    return None
+
+def process_chunk(kernel, first_number, records):
+    """Parse and compute stage for one chunk of raw records. Module-level so process pools can pickle it."""
+    lines = []
+    scored = []
+    errors = []
+    for trip_number, record in enumerate(records, start=first_number):
+        try:
+            trip = parse_trip(record)
+            expected = _expected_cents(record)
+            output = f"{kernel(*trip):.2f}"
+        except (KeyError, ValueError, TypeError, ArithmeticError) as e:
+            errors.append((trip_number, f"{e!r}. Record: {record}"))
+            lines.append("ERROR")
+            continue
+        lines.append(output)
+        if expected is not None:
+            scored.append((trip_number, trip, expected, round(float(output) * 100)))
+    return ChunkResult(first_number, lines, scored, errors)
+
+def process_store_chunk(kernel, first_number, rows):
+    """process_chunk for (days, miles, receipts, expected) rows of a CaseStore, which are already parsed."""
+    lines = []
+    scored = []
+    for trip_number, (days, miles, receipts, expected) in enumerate(rows, start=first_number):
+        output = f"{kernel(days, miles, receipts):.2f}"
+        lines.append(output)
+        if expected is not None:
+            scored.append((trip_number, (days, miles, receipts), round(expected * 100), round(float(output) * 100)))
+    return ChunkResult(first_number, lines, scored, [])
+
+class StreamMetrics:
+    """eval.sh's metrics accumulated one chunk at a time in constant memory."""
+
+    def __init__(self):
+        self.trips = 0
+        self.failed = 0
+        self.scored = 0
+        self.exact_matches = 0
+        self.close_matches = 0
+        self.total_error_cents = 0
+        self.max_error_cents = 0
+        self.max_error_case = None # (trip number, trip, expected cents, actual cents)
+
+    def add(self, chunk_result):
+        self.trips += len(chunk_result.lines)
+        self.failed += len(chunk_result.errors)
+        for scored_trip in chunk_result.scored:
+            error = abs(scored_trip[3] - scored_trip[2])
+            self.scored += 1
+            self.total_error_cents += error
+            if error < EXACT_MATCH_CENTS:
+                self.exact_matches += 1
+            if error < CLOSE_MATCH_CENTS:
+                self.close_matches += 1
+            if error > self.max_error_cents:
+                self.max_error_cents = error
+                self.max_error_case = scored_trip
+
+    @property
+    def average_error(self):
+        return self.total_error_cents / 100 / self.scored if self.scored else None
+
+    def as_dict(self):
+        return {"trips": self.trips, "failed": self.failed, "scored": self.scored,
+                "exact_matches": self.exact_matches, "close_matches": self.close_matches,
+                "average_error": self.average_error, "max_error": self.max_error_cents / 100,
+                "max_error_case": self.max_error_case}
+
+    def report(self, stream):
+        print(f"Trips processed: {self.trips} ({self.failed} failed)", file=stream)
+        if not self.scored:
+            print("No expected outputs in the input; nothing to score.", file=stream)
+            return
+        print(f"Exact matches (±$0.01): {self.exact_matches} ({self.exact_matches * 100 / self.scored:.1f}%)", file=stream)
+        print(f"Close matches (±$1.00): {self.close_matches} ({self.close_matches * 100 / self.scored:.1f}%)", file=stream)
+        print(f"Average error: ${self.average_error:.2f}", file=stream)
+        print(f"Maximum error: ${self.max_error_cents / 100:.2f}", file=stream)
+        if self.max_error_case is not None:
+            trip_number, (days, miles, receipts), expected, actual = self.max_error_case
+            print(f"Maximum error case: Trip {trip_number}: {days} days, {miles:g} miles, ${receipts:.2f} receipts "
+                  f"(expected {expected / 100:.2f}, got {actual / 100:.2f})", file=stream)
+
+def _make_executor(executor, workers):
+    if executor == "thread":
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(max_workers=workers)
+    if executor == "process":
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor '{executor}'. Expected one of: {', '.join(EXECUTORS)}")
+
+def compute_chunks(chunks, kernel, chunk_function=process_chunk, workers=0, executor="process", max_in_flight=None):
+    """Yields chunk_function(kernel, first_number, chunk) for each chunk, in input order.
+
+    workers=0 computes inline. Otherwise chunks go to a pool of that many workers with at
+    most max_in_flight outstanding, so a slow sink or a huge input never queues unbounded work.
+    """
+    first_number = 1
+    if workers <= 0:
+        for chunk in chunks:
+            yield chunk_function(kernel, first_number, chunk)
+            first_number += len(chunk)
+        return
+
+    max_in_flight = max_in_flight or workers * IN_FLIGHT_CHUNKS_PER_WORKER
+    pending = deque()
+    with _make_executor(executor, workers) as pool:
+        for chunk in chunks:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(pool.submit(chunk_function, kernel, first_number, chunk))
+            first_number += len(chunk)
+        while pending:
+            yield pending.popleft().result()
+
+def run_pipeline(chunk_results, output_stream=None, error_stream=sys.stderr):
+    """Sink stage: writes each chunk's lines (if output_stream is given) and returns the StreamMetrics."""
+    metrics = StreamMetrics()
+    for chunk_result in chunk_results:
+        for trip_number, message in chunk_result.errors:
+            print(f"Error on trip {trip_number}: {message}", file=error_stream)
+        if output_stream is not None:
+            output_stream.write("\n".join(chunk_result.lines) + "\n")
+        metrics.add(chunk_result)
+    if output_stream is not None:
+        output_stream.flush()
+    return metrics
+
+def stream_records(input_stream, output_stream=None, fmt=None, kernel=calculate_reimbursement,
+                   chunk_size=DEFAULT_CHUNK_SIZE, workers=0, executor="process"):
+    """Runs the whole pipeline over a text stream in any trip_io format and returns the StreamMetrics."""
+    chunks = iter_chunks(iter_records(input_stream, fmt), chunk_size)
+    return run_pipeline(compute_chunks(chunks, kernel, process_chunk, workers, executor), output_stream)
+
+def _store_chunks(store, chunk_size):
+    """Chunks of float rows sliced from a CaseStore's columns; only one chunk is materialized at a time."""
+    expected_cents = store.expected_cents
+    for start in range(0, len(store), chunk_size):
+        stop = min(start + chunk_size, len(store))
+        expected = expected_cents[start:stop] if expected_cents is not None else [None] * (stop - start)
+        yield [(days, miles / 100, receipts / 100, cents / 100 if cents is not None else None)
+               for days, miles, receipts, cents in zip(store.days[start:stop], store.miles_hundredths[start:stop],
+                                                       store.receipts_cents[start:stop], expected)]
+
+def stream_store(store, output_stream=None, kernel=calculate_reimbursement,
+                 chunk_size=DEFAULT_CHUNK_SIZE, workers=0, executor="process"):
+    """stream_records for a memory-mapped CaseStore."""
+    chunks = _store_chunks(store, chunk_size)
+    return run_pipeline(compute_chunks(chunks, kernel, process_store_chunk, workers, executor), output_stream)
+
+def open_input_store(input_path):
+    """The CaseStore to stream instead of input_path (the path itself or its fresh store), or None."""
+    from case_store import MAGIC, CaseStore, open_store
+
+    with open(input_path, "rb") as input_file:
+        if input_file.read(len(MAGIC)) == MAGIC:
+            return CaseStore(input_path)
+    return open_store(input_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream trips through calculate_reimbursement in fixed-size chunks and "
+                                                 "report eval.sh's metrics for inputs with expected outputs.")
+    parser.add_argument("input", nargs="?", default="-", help="Trip file (json, ndjson, csv or a case store); - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (auto-detected by default)")
+    parser.add_argument("--output", help="Write one result per trip to this file (- for stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Trips per chunk")
+    parser.add_argument("--workers", type=int, default=0, help="Compute-stage workers (0 computes inline)")
+    parser.add_argument("--executor", choices=EXECUTORS, default="process",
+                        help="Pool type; threads only pay off for kernels that release the GIL")
+    args = parser.parse_args()
+    if args.chunk_size <= 0 or args.workers < 0:
+        parser.error("--chunk-size must be positive and --workers must not be negative")
+
+    output_file = None
+    try:
+        if args.output == "-":
+            output_stream, report_stream = sys.stdout, sys.stderr # Keep stdout to results only
+        elif args.output:
+            output_file = open(args.output, "w")
+            output_stream, report_stream = output_file, sys.stdout
+        else:
+            output_stream, report_stream = None, sys.stdout
+        options = dict(chunk_size=args.chunk_size, workers=args.workers, executor=args.executor)
+
+        store = None
+        if args.input != "-" and args.format is None:
+            store = open_input_store(args.input)
+        if store is not None:
+            with store:
+                metrics = stream_store(store, output_stream, **options)
+        elif args.input == "-":
+            metrics = stream_records(sys.stdin, output_stream, args.format, **options)
+        else:
+            with open(args.input, "r") as input_file:
+                metrics = stream_records(input_file, output_stream, args.format, **options)
+    except (OSError, ValueError) as e: # ValueError covers undecodable JSON
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if output_file is not None:
+            output_file.close()
+    metrics.report(report_stream)
@@ -0,0 +1,209 @@
+import csv
+import json
+
+# Streaming readers for batches of trips. Every reader is a generator that pulls the
+# input a block at a time, so memory stays bounded no matter how many trips a file holds.
+#
+# Supported formats:
+#   json   - a JSON array of trips, as in private_cases.json / public_cases.json
+#   ndjson - one JSON trip object per line
+#   csv    - trip_duration_days,miles_traveled,total_receipts_amount (header row optional)
+#
+# A JSON trip is either {"trip_duration_days": ..., "miles_traveled": ..., "total_receipts_amount": ...}
+# or a public case wrapping those keys in "input".
+
+TRIP_FIELDS = ("trip_duration_days", "miles_traveled", "total_receipts_amount")
+FORMATS = ("json", "ndjson", "csv")
+READ_BLOCK_SIZE = 1 << 16 # Characters read per refill by the streaming JSON array parser
+MAX_ELEMENT_CHARS = 1 << 20 # A JSON array element still undecodable at this size is rejected
+# A value decoded (or failing to decode) this close to the end of the buffer may have been
+# cut off by the block boundary ("1." of "1.5" decodes as 1, "tr" of "true" fails); it is
+# decoded again after a refill. Decode errors further from the end are syntax errors.
+TRUNCATION_MARGIN = 16
+
+class MalformedRecord:
+    """Stands in for an input line that could not be decoded; parse_trip rejects it.
+
+    Lets line-oriented readers report one bad record instead of aborting the whole stream.
+    """
+
+    __slots__ = ("text", "error")
+
+    def __init__(self, text, error):
+        self.text = text
+        self.error = error
+
+    def __str__(self):
+        return self.text
+
+def parse_trip(record):
+    """Converts one raw record (dict or CSV row) into (days, miles, receipts).
+
+    Applies the same conversions as the single-trip CLI; raises ValueError, TypeError
+    or KeyError for malformed records.
+    """
+    if isinstance(record, MalformedRecord):
+        raise ValueError(record.error)
+    if isinstance(record, dict):
+        fields = record.get("input", record)
+        values = [fields[name] for name in TRIP_FIELDS]
+    else:
+        if len(record) != len(TRIP_FIELDS):
+            raise ValueError(f"expected {len(TRIP_FIELDS)} columns, got {len(record)}")
+        values = record
+    return int(values[0]), float(values[1]), float(values[2])
+
+def detect_format(first_char):
+    """Guesses the input format from its first non-whitespace character."""
+    if first_char == "[":
+        return "json"
+    if first_char == "{":
+        return "ndjson"
+    return "csv"
+
+def _skip_whitespace(buffer, index):
+    while index < len(buffer) and buffer[index] in " \t\r\n":
+        index += 1
+    return index
+
+def iter_json_array(stream):
+    """Yields the elements of a top-level JSON array without loading the whole document.
+
+    Raises ValueError (json.JSONDecodeError for syntax errors) as soon as the input can no
+    longer be a valid array, including missing, doubled or trailing commas.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    index = 0
+    eof = False
+    started = False
+    state = "first" # "first" right after "[", "value" after a comma, "separator" after an element
+
+    while True:
+        index = _skip_whitespace(buffer, index)
+        if index >= len(buffer) and not eof:
+            chunk = stream.read(READ_BLOCK_SIZE)
+            eof = not chunk
+            buffer = buffer[index:] + chunk
+            index = 0
+            continue
+
+        if not started:
+            if buffer[index:index + 1] != "[":
+                raise ValueError("JSON input must be an array of trips")
+            started = True
+            index += 1
+            continue
+        if index >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[index] == "]":
+            if state == "value":
+                raise json.JSONDecodeError("Trailing comma before ']'", buffer, index)
+            return
+        if buffer[index] == ",":
+            if state != "separator":
+                raise json.JSONDecodeError("Expecting value", buffer, index)
+            state = "value"
+            index += 1
+            continue
+        if state == "separator":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, index)
+
+        try:
+            element, end = decoder.raw_decode(buffer, index)
+        except json.JSONDecodeError as e:
+            truncated = e.msg.startswith("Unterminated string") or e.pos >= len(buffer) - TRUNCATION_MARGIN
+            if eof or not truncated:
+                raise
+            element, end = None, len(buffer) # Element is split across reads
+        if end >= len(buffer) - TRUNCATION_MARGIN and not eof:
+            if len(buffer) - index > MAX_ELEMENT_CHARS:
+                raise ValueError(f"JSON array element longer than {MAX_ELEMENT_CHARS} characters")
+            # Refill and decode again; a value ending near the end of the buffer may be truncated
+            # (a number cut after "1." still decodes, as 1)
+            chunk = stream.read(READ_BLOCK_SIZE)
+            eof = not chunk
+            buffer = buffer[index:] + chunk
+            index = 0
+            continue
+        index = end
+        state = "separator"
+        yield element
+
+def iter_ndjson(stream):
+    """Yields one decoded object per non-blank line; an undecodable line yields a MalformedRecord."""
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield MalformedRecord(line.strip(), f"invalid JSON: {e}")
+
+def _is_header_row(row):
+    try:
+        float(row[0])
+    except ValueError:
+        return True
+    return False
+
+def iter_csv(stream):
+    """Yields CSV rows, skipping blank lines and a leading header row (a first row whose first column is not a number)."""
+    first_row = True
+    for row in csv.reader(stream):
+        if not row:
+            continue
+        if first_row:
+            first_row = False
+            if _is_header_row(row):
+                continue
+        yield row
+
+def iter_records(stream, fmt=None):
+    """Yields raw trip records from stream in the given format (auto-detected when None)."""
+    if fmt is None:
+        first_char = stream.read(1)
+        while first_char and first_char.isspace():
+            first_char = stream.read(1)
+        fmt = detect_format(first_char)
+        stream = _Prepended(first_char, stream)
+    if fmt == "json":
+        return iter_json_array(stream)
+    if fmt == "ndjson":
+        return iter_ndjson(stream)
+    if fmt == "csv":
+        return iter_csv(stream)
+    raise ValueError(f"Unknown format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+
+def iter_chunks(iterable, chunk_size):
+    """Groups an iterable into lists of at most chunk_size items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class _Prepended:
+    """Text stream wrapper that replays characters consumed while sniffing the format."""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size=-1):
+        prefix, self._prefix = self._prefix, ""
+        if size is None or size < 0:
+            return prefix + self._stream.read()
+        return prefix + self._stream.read(size - len(prefix))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        prefix, self._prefix = self._prefix, ""
+        line = self._stream.readline()
+        if not prefix and not line:
+            raise StopIteration
+        return prefix + line
@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import random
+
+import pytest
+
+# calculate_reimbursement_batch promises bit-identical results to the scalar
+# calculate_reimbursement; these tests hold it to that on both case files.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "strategy1_interview_driven"))
+
+np = pytest.importorskip("numpy")
+
+from calculate_reimbursement import DEFAULT_PARAMS, calculate_reimbursement, calculate_reimbursement_batch
+
+CASE_FILES = ("public_cases.json", "private_cases.json")
+
+def _load_trips(file_name):
+    with open(os.path.join(REPO_DIR, file_name), "r") as f:
+        cases = json.load(f)
+    return [(int(trip["trip_duration_days"]), float(trip["miles_traveled"]), float(trip["total_receipts_amount"]))
+            for trip in (case.get("input", case) for case in cases)]
+
+def _assert_batch_matches_scalar(trips, params):
+    days, miles, receipts = (np.array(column, dtype=np.float64) for column in zip(*trips))
+    batch = calculate_reimbursement_batch(days, miles, receipts, params)
+    scalar = np.array([calculate_reimbursement(*trip, params) for trip in trips])
+    mismatches = np.flatnonzero(batch != scalar)
+    assert mismatches.size == 0, f"{mismatches.size} trips differ, first {trips[mismatches[0]]}: " \
+                                 f"batch {batch[mismatches[0]]!r} != scalar {scalar[mismatches[0]]!r}"
+
+@pytest.mark.parametrize("file_name", CASE_FILES)
+def test_batch_matches_scalar_default_params(file_name):
+    _assert_batch_matches_scalar(_load_trips(file_name), DEFAULT_PARAMS)
+
+@pytest.mark.parametrize("file_name", CASE_FILES)
+def test_batch_matches_scalar_perturbed_params(file_name):
+    rng = random.Random(file_name)
+    trips = _load_trips(file_name)
+    for _ in range(5):
+        params = {name: value * rng.uniform(0.5, 1.5) if isinstance(value, float) else value
+                  for name, value in DEFAULT_PARAMS.items()}
+        _assert_batch_matches_scalar(trips, params)
@@ -3,9 +3,9 @@ import os
 import json
 import re
 import random
+import atexit
+from collections import OrderedDict
 from multiprocessing import Pool, cpu_count
-from functools import partial
-import fileinput # For persisting best params at the end
 import copy
 from copy import deepcopy # Ensure deepcopy is available
 
@@ -46,9 +46,12 @@ if CALC_SCRIPT_MODULE_DIR not in sys.path:
 
 # Import the target function and its default parameters
 try:
-    from calculate_reimbursement import calculate_reimbursement, DEFAULT_PARAMS
+    from calculate_reimbursement import calculate_reimbursement, compile_params, DEFAULT_PARAMS, \
+        COMPONENT_FUNCTIONS, COMPONENT_PARAMETERS, combine_components, round_receipts_amount, \
+        compile_param_matrix, calculate_reimbursement_matrix
+    from case_store import CaseStore, open_cases
 except ImportError as e:
-    print(f"Error: Could not import 'calculate_reimbursement' or 'DEFAULT_PARAMS' from {CALC_SCRIPT_ABS_PATH}. Ensure the file exists and is importable. Error: {e}", file=sys.stderr)
+    print(f"Error: Could not import the calculation API (calculate_reimbursement, compile_params, DEFAULT_PARAMS, components, matrix) from {CALC_SCRIPT_ABS_PATH}. Ensure the file exists and is importable. Error: {e}", file=sys.stderr)
     sys.exit(1)
 
 # --- Helper Functions ---
@@ -65,55 +68,344 @@ def load_test_cases(json_path):
         print(f"Error: Could not decode JSON from {json_path}", file=sys.stderr)
         return []
 
-def process_single_case(case, params_for_this_run):
-    """Worker function to process a single test case with a given set of parameters."""
+# --- Persistent Evaluation Pool ---
+# One long-lived worker pool serves every trial. Each worker receives the test cases
+# once through the pool initializer (pre-parsed into tuples), so a task only carries
+# a chunk of candidate parameter sets and returns one average error per candidate.
+
+TASKS_PER_PROCESS = 4 # Chunks per worker per evaluation call; >1 keeps workers busy when chunks finish unevenly
+RANDOM_SEARCH_BATCH_SIZE = 4096 # Candidates drawn and scored per evaluate_parameter_sets call in random_search_parameters
+
+_evaluation_pool = None
+_evaluation_pool_cases = None
+_evaluation_pool_num_cases = 0
+_worker_cases = None
+
+def parse_test_cases(test_cases):
+    """Converts case dicts into (days, miles, receipts, expected) tuples, skipping malformed cases.
+
+    test_cases may also be a CaseStore (see case_store.py), whose rows are already in this form.
+    """
+    if isinstance(test_cases, CaseStore):
+        if not test_cases.has_expected:
+            print(f"Error: Case store {test_cases.path} has no expected outputs to tune against.", file=sys.stderr)
+            return []
+        return list(test_cases)
+    parsed_cases = []
+    for case in test_cases:
+        try:
+            input_data = case['input']
+            parsed_cases.append((
+                int(input_data['trip_duration_days']),
+                float(input_data['miles_traveled']),
+                float(input_data['total_receipts_amount']),
+                float(case['expected_output']),
+            ))
+        except (KeyError, ValueError, TypeError) as conversion_error:
+            print(f"Data conversion/KeyError for case ID {case.get('id', 'N/A') if isinstance(case, dict) else 'N/A'}: {conversion_error}. \nCase data: {case}.", file=sys.stderr)
+    return parsed_cases
+
+def _init_evaluation_worker(parsed_cases):
+    """Pool initializer: stores the shared, pre-parsed test cases once per worker process."""
+    global _worker_cases
+    _worker_cases = parsed_cases
+
+def _case_errors(compiled_params, parsed_cases, params):
+    """Absolute error per case, in order; cases whose calculation raises are reported and skipped."""
+    errors = []
+    for trip_duration, miles_traveled, receipts_amount, expected_reimbursement in parsed_cases:
+        try:
+            calculated_reimbursement = calculate_reimbursement(
+                trip_duration, miles_traveled, receipts_amount, params=compiled_params
+            )
+        except Exception as e:
+            print(f"Unexpected error processing case ({trip_duration}, {miles_traveled}, {receipts_amount}): {e}. \nParams sample: {params}", file=sys.stderr)
+            continue
+        errors.append(abs(calculated_reimbursement - expected_reimbursement))
+    return errors
+
+def _average(case_errors):
+    """Left-to-right mean of per-case errors (inf if every case failed)."""
+    total_error = 0.0
+    for error in case_errors:
+        total_error += error
+    if not case_errors:
+        return float('inf') # Avoid division by zero if all cases failed
+    return total_error / len(case_errors)
+
+def average_error_for_params(params, parsed_cases):
+    """Average absolute error of one parameter set over pre-parsed cases (inf if every case fails)."""
     try:
-        input_data = case['input']
-        case_id = case.get('id', 'N/A') # Get case ID from top level if available
-
-        trip_duration = int(input_data['trip_duration_days'])
-        miles_traveled = float(input_data['miles_traveled'])
-        receipts_amount = float(input_data['total_receipts_amount'])
-        expected_reimbursement = float(case['expected_output']) # Corrected key based on file structure
-
-        # Call the imported calculation function with the specific params for this run
-        calculated_reimbursement = calculate_reimbursement(
-            trip_duration, miles_traveled, receipts_amount, params=params_for_this_run
-        )
-        error = abs(calculated_reimbursement - expected_reimbursement)
-        return error
-    except (KeyError, ValueError) as conversion_error:
-        # This case is likely if JSON data is malformed or a key is missing for a specific entry
-        print(f"Data conversion/KeyError for case ID {case_id if 'case_id' in locals() else case.get('id', 'N/A')}: {conversion_error}. \nCase data: {case}. \nInput data accessed: {input_data if 'input_data' in locals() else 'N/A'}", file=sys.stderr)
-        return float('inf')
-    except Exception as e:
-        # This would be an error within calculate_reimbursement or other unexpected issue
-        print(f"Unexpected error processing case ID {case_id if 'case_id' in locals() else case.get('id', 'N/A')}: {e}. \nCase data: {case}. \nParams sample: {params_for_this_run}", file=sys.stderr)
+        compiled_params = compile_params(params) # Validate and precompute tier offsets once per candidate
+    except ValueError as e:
+        print(f"Invalid parameter set: {e}. \nParams sample: {params}", file=sys.stderr)
         return float('inf')
+    return _average(_case_errors(compiled_params, parsed_cases, params))
 
-def perform_parallel_evaluation(params_to_test, all_test_cases):
-    """Evaluates all test cases in parallel for a given set of parameters."""
-    if not all_test_cases:
-        return float('inf')
+def _evaluate_params_chunk(params_chunk):
+    """Worker task: scores a chunk of candidate parameter sets against the worker's cases."""
+    return [average_error_for_params(params, _worker_cases) for params in params_chunk]
+
+def _evaluate_case_range(task):
+    """Worker task: per-case errors of one parameter set over a slice of the worker's cases."""
+    params, start, stop = task
+    return _case_errors(compile_params(params), _worker_cases[start:stop], params)
+
+def _evaluate_split_by_cases(params_list, pool, num_cases, num_processes):
+    """Scores a few candidates by spreading each one's cases over the workers.
+
+    The per-case errors come back in order and are summed here left to right, so the
+    averages are bit-identical to average_error_for_params().
+    """
+    errors = []
+    case_chunk_size = max(1, -(-num_cases // (num_processes * TASKS_PER_PROCESS)))
+    for params in params_list:
+        try:
+            compile_params(params)
+        except ValueError as e:
+            print(f"Invalid parameter set: {e}. \nParams sample: {params}", file=sys.stderr)
+            errors.append(float('inf'))
+            continue
+        tasks = [(params, start, start + case_chunk_size) for start in range(0, num_cases, case_chunk_size)]
+        errors.append(_average([error for chunk_errors in pool.map(_evaluate_case_range, tasks) for error in chunk_errors]))
+    return errors
+
+def get_evaluation_pool(test_cases):
+    """Returns the shared worker pool, (re)creating it if it was built for different test cases."""
+    global _evaluation_pool, _evaluation_pool_cases, _evaluation_pool_num_cases
+    if _evaluation_pool is None or _evaluation_pool_cases is not test_cases:
+        close_evaluation_pool()
+        parsed_cases = parse_test_cases(test_cases)
+        _evaluation_pool = Pool(processes=cpu_count(), initializer=_init_evaluation_worker, initargs=(parsed_cases,))
+        _evaluation_pool_cases = test_cases
+        _evaluation_pool_num_cases = len(parsed_cases)
+    return _evaluation_pool
+
+def close_evaluation_pool():
+    """Shuts down the shared worker pool, if one is running."""
+    global _evaluation_pool, _evaluation_pool_cases
+    if _evaluation_pool is not None:
+        _evaluation_pool.close()
+        _evaluation_pool.join()
+    _evaluation_pool = None
+    _evaluation_pool_cases = None
+
+atexit.register(close_evaluation_pool)
+
+def evaluate_parameter_sets(params_list, test_cases):
+    """Evaluates many candidate parameter sets; returns one average error per candidate.
+
+    Uses the broadcast MatrixEvaluator when NumPy is available, the shared pool otherwise.
+    Both return exactly the same values.
+    """
+    if not params_list:
+        return []
+    if not test_cases:
+        return [float('inf')] * len(params_list)
+
+    matrix_evaluator = get_matrix_evaluator(test_cases)
+    if matrix_evaluator is not None:
+        return matrix_evaluator.average_errors(params_list)
 
     num_processes = cpu_count()
-    # Create a partial function to pass the fixed 'params_to_test' to the worker
-    worker_func = partial(process_single_case, params_for_this_run=params_to_test)
-    
-    total_error = 0
-    num_valid_cases = 0
+    pool = get_evaluation_pool(test_cases)
+    if len(params_list) < num_processes:
+        # Too few candidates to occupy every worker: split each one's cases instead
+        return _evaluate_split_by_cases(params_list, pool, _evaluation_pool_num_cases, num_processes)
 
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(worker_func, all_test_cases)
-    
-    for error_value in results:
-        if error_value != float('inf'):
-            total_error += error_value
-            num_valid_cases += 1
-    
-    if num_valid_cases == 0:
-        return float('inf') # Avoid division by zero if all cases failed
-    return total_error / num_valid_cases
+    chunk_size = max(1, -(-len(params_list) // (num_processes * TASKS_PER_PROCESS)))
+    chunks = [params_list[i:i + chunk_size] for i in range(0, len(params_list), chunk_size)]
+    return [error for chunk_errors in pool.map(_evaluate_params_chunk, chunks) for error in chunk_errors]
+
+# --- Broadcast Evaluation (NumPy) ---
+# Scores a block of K candidates against all N cases as one K x N matrix
+# (calculate_reimbursement_matrix), chunked so the temporaries stay within a memory budget.
+# Errors are summed left to right per candidate, continuing across case chunks, so each
+# average is bit-identical to average_error_for_params().
+
+MATRIX_MEMORY_FRACTION = 0.25 # Share of currently available RAM one chunk may use
+MATRIX_MAX_CHUNK_CELLS = 1 << 16 # Candidate x case cells per chunk; larger chunks fall out of cache and run slower
+MATRIX_TEMPORARY_ARRAYS = 16 # Chunk-sized float64 arrays alive at once inside the kernel (upper bound)
+FALLBACK_AVAILABLE_MEMORY = 512 * 1024 * 1024 # Assumed available RAM when the OS does not report it
+
+_matrix_evaluator = None
+
+def available_memory_bytes():
+    """RAM currently available to this process: MemAvailable on Linux, free pages elsewhere."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return FALLBACK_AVAILABLE_MEMORY
+
+def matrix_chunk_shape(num_candidates, num_cases, memory_bytes=None):
+    """(candidates, cases) per chunk: fits MATRIX_MEMORY_FRACTION of available RAM and the cache-sized cap."""
+    if memory_bytes is None:
+        memory_bytes = available_memory_bytes()
+    budget_cells = int(memory_bytes * MATRIX_MEMORY_FRACTION) // (8 * MATRIX_TEMPORARY_ARRAYS)
+    chunk_cells = max(1, min(budget_cells, MATRIX_MAX_CHUNK_CELLS))
+    cases_per_chunk = max(1, min(num_cases, chunk_cells))
+    candidates_per_chunk = max(1, min(num_candidates, chunk_cells // cases_per_chunk))
+    return candidates_per_chunk, cases_per_chunk
+
+class MatrixEvaluator:
+    """Scores blocks of candidate parameter sets against fixed cases with NumPy broadcasting."""
+
+    def __init__(self, test_cases):
+        import numpy as np
+        self._np = np
+        if isinstance(test_cases, CaseStore) and test_cases.has_expected:
+            self.days, self.miles, self.receipts, self.expected = test_cases.numpy_columns()
+            return
+        parsed_cases = parse_test_cases(test_cases)
+        self.days, self.miles, self.receipts, self.expected = (
+            np.array([case[field] for case in parsed_cases], dtype=np.float64) for field in range(4))
+
+    def average_errors(self, params_list, memory_bytes=None):
+        """Average absolute error per candidate (inf for invalid sets); same values as evaluate_parameters."""
+        np = self._np
+        errors = [float('inf')] * len(params_list)
+        num_cases = len(self.expected)
+        if num_cases == 0:
+            return errors
+
+        valid_indices = []
+        compiled_list = []
+        for index, params in enumerate(params_list):
+            try:
+                compiled_list.append(compile_params(params))
+            except ValueError as e:
+                print(f"Invalid parameter set: {e}. \nParams sample: {params}", file=sys.stderr)
+                continue
+            valid_indices.append(index)
+        if not compiled_list:
+            return errors
+
+        param_matrix = compile_param_matrix(compiled_list)
+        candidates_per_chunk, cases_per_chunk = matrix_chunk_shape(len(param_matrix), num_cases, memory_bytes)
+        for start in range(0, len(param_matrix), candidates_per_chunk):
+            chunk_params = param_matrix[start:start + candidates_per_chunk]
+            total_error = np.zeros(len(chunk_params), dtype=np.float64)
+            for case_start in range(0, num_cases, cases_per_chunk):
+                cases = slice(case_start, case_start + cases_per_chunk)
+                chunk_errors = calculate_reimbursement_matrix(self.days[cases], self.miles[cases], self.receipts[cases], chunk_params)
+                chunk_errors -= self.expected[cases]
+                np.abs(chunk_errors, out=chunk_errors)
+                # Sequential running sum (cumsum), seeded with the previous chunks' total
+                chunk_errors[:, 0] += total_error
+                np.cumsum(chunk_errors, axis=1, out=chunk_errors)
+                total_error = chunk_errors[:, -1].copy()
+            for offset, candidate_error in enumerate(total_error / num_cases):
+                errors[valid_indices[start + offset]] = float(candidate_error)
+        return errors
+
+def get_matrix_evaluator(test_cases):
+    """Returns a MatrixEvaluator for test_cases, reused across calls, or None without NumPy."""
+    global _matrix_evaluator
+    if _matrix_evaluator is None or _matrix_evaluator[0] is not test_cases:
+        try:
+            _matrix_evaluator = (test_cases, MatrixEvaluator(test_cases))
+        except ImportError:
+            return None
+    return _matrix_evaluator[1]
+
+# --- Incremental Evaluation for Single-Parameter Sweeps ---
+# calculate_reimbursement is a sum of independent components times a multiplier (see
+# COMPONENT_PARAMETERS in calculate_reimbursement.py). When only one parameter changes, only
+# the components that read it need recomputing; the rest come from per-case caches keyed by
+# the values of the parameters each component depends on.
+
+COMPONENT_CACHE_SIZE = 4 # Cached value-sets kept per component (LRU); the base set plus recent sweep values
+
+class IncrementalEvaluator:
+    """Scores parameter sets against fixed cases, recomputing only components whose parameters changed."""
+
+    def __init__(self, test_cases, base_params, cache_size=COMPONENT_CACHE_SIZE):
+        parsed_cases = parse_test_cases(test_cases)
+        self._trips = [(days, miles, receipts) for days, miles, receipts, _ in parsed_cases]
+        # Component inputs: receipt rounding is parameter-free, so it is done once here
+        self._inputs = [(days, miles, round_receipts_amount(receipts)) for days, miles, receipts in self._trips]
+        self._expected = [expected for _, _, _, expected in parsed_cases]
+        self._cache_size = max(1, cache_size)
+        self._caches = {name: OrderedDict() for name in COMPONENT_FUNCTIONS}
+        self.components_computed = 0 # Number of (component, parameter values) columns computed so far
+
+        # Fill the caches for the base parameters and make sure the components still
+        # reproduce calculate_reimbursement exactly.
+        base = compile_params(base_params)
+        columns = self._component_columns(base)
+        for (days, miles, receipts), *components in zip(self._trips, *columns):
+            if combine_components(*components) != calculate_reimbursement(days, miles, receipts, params=base):
+                raise RuntimeError(f"Component functions disagree with calculate_reimbursement for trip ({days}, {miles}, {receipts})")
+
+    def _component_columns(self, compiled_params):
+        """Per-case values of every component for compiled_params, from cache where possible."""
+        columns = []
+        for name, component_fn in COMPONENT_FUNCTIONS.items():
+            key = tuple(getattr(compiled_params, param_name) for param_name in COMPONENT_PARAMETERS[name])
+            cache = self._caches[name]
+            values = cache.get(key)
+            if values is None:
+                values = [component_fn(days, miles, receipts, compiled_params) for days, miles, receipts in self._inputs]
+                self.components_computed += 1
+                cache[key] = values
+                if len(cache) > self._cache_size:
+                    cache.popitem(last=False)
+            else:
+                cache.move_to_end(key)
+            columns.append(values)
+        return columns
+
+    def average_error(self, params):
+        """Average absolute error for params; same value evaluate_parameters returns."""
+        try:
+            compiled_params = compile_params(params)
+        except ValueError as e:
+            print(f"Invalid parameter set: {e}. \nParams sample: {params}", file=sys.stderr)
+            return float('inf')
+        if not self._expected:
+            return float('inf')
+
+        total_error = 0.0
+        # Inlined combine_components(); keeps the per-case delta down to a handful of float ops
+        for expected, per_diem, mileage, receipts, five_day_bonus, efficiency_bonus, multiplier in \
+                zip(self._expected, *self._component_columns(compiled_params)):
+            total_error += abs((per_diem + mileage + receipts + five_day_bonus + efficiency_bonus) * multiplier - expected)
+        return total_error / len(self._expected)
+
+def persist_parameters(updates):
+    """Atomically rewrites values of DEFAULT_PARAMS in calculate_reimbursement.py.
+
+    The new source is written to a temporary file and os.replace()d over the original, so
+    readers (including the reimbursement server's reloader) never see a half-written file.
+    Returns the names that were not found in the file.
+    """
+    with open(CALC_SCRIPT_ABS_PATH, 'r') as f:
+        source = f.read()
+    missing = []
+    for param_name, value in updates.items():
+        str_value = f'\"{value}\"' if isinstance(value, str) else str(value)
+        pattern = re.compile(r'("{}"\s*:\s*)([^\s,#]+)'.format(re.escape(param_name)))
+        source, count = pattern.subn(lambda match: match.group(1) + str_value, source)
+        if count == 0:
+            missing.append(param_name)
+
+    temp_path = f"{CALC_SCRIPT_ABS_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(source)
+        os.chmod(temp_path, os.stat(CALC_SCRIPT_ABS_PATH).st_mode)
+        os.replace(temp_path, CALC_SCRIPT_ABS_PATH)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    return missing
 
 def persist_best_params(param_name, best_value):
     """Modifies DEFAULT_PARAMS in calculate_reimbursement.py with the best found value."""
@@ -121,41 +413,30 @@ def persist_best_params(param_name, best_value):
         if not os.path.exists(CALC_SCRIPT_ABS_PATH):
             print(f"Error: Calculation script not found at {CALC_SCRIPT_ABS_PATH} for persisting.", file=sys.stderr)
             return False
-
-        str_best_value = f'\"{best_value}\"' if isinstance(best_value, str) else str(best_value)
-        pattern = re.compile(r'("{}"\s*:\s*)(\S+)(,?)'.format(param_name))
-        modified = False
-
-        for line in fileinput.input(CALC_SCRIPT_ABS_PATH, inplace=True):
-            match = pattern.search(line)
-            if match:
-                new_line = pattern.sub(r'\g<1>{}\g<3>'.format(str_best_value), line)
-                sys.stdout.write(new_line)
-                modified = True
-            else:
-                sys.stdout.write(line)
-        
-        if not modified:
+        if persist_parameters({param_name: best_value}):
             print(f"Warning: Parameter '{param_name}' not found for persisting in {CALC_SCRIPT_ABS_PATH}.", file=sys.stderr)
-        return modified
+            return False
+        return True
     except Exception as e:
         print(f"Error persisting parameter {param_name} in {CALC_SCRIPT_ABS_PATH}: {e}", file=sys.stderr)
         return False
 
 def evaluate_parameters(params_to_test, test_cases):
-    num_processes = cpu_count()
-    # print(f"Using up to {num_processes} processes for parallel evaluation.")
-    
-    with Pool(processes=num_processes) as pool:
-        process_func = partial(process_single_case, params_for_this_run=params_to_test)
-        errors = pool.map(process_func, test_cases)
-    
-    valid_errors = [e for e in errors if e != float('inf')]
-    if not valid_errors:
-        return float('inf')
-    
-    average_error = sum(valid_errors) / len(valid_errors)
-    return average_error
+    return evaluate_parameter_sets([params_to_test], test_cases)[0]
+
+def sample_random_parameters(base_params, rng=random):
+    """Returns a copy of base_params with every PARAMETER_RANGES entry drawn at random from rng."""
+    candidate_params = deepcopy(base_params) # Start with base, then override with random
+    for param_name, (min_val, max_val, param_type) in PARAMETER_RANGES.items():
+        if param_type == 'float':
+            random_value = rng.uniform(min_val, max_val)
+        elif param_type == 'int':
+            random_value = rng.randint(min_val, max_val)
+        else:
+            # Fallback for safety, though should not happen with defined ranges
+            random_value = base_params.get(param_name, min_val)
+        candidate_params[param_name] = random_value
+    return candidate_params
 
 def random_search_parameters(num_trials, test_cases, base_params):
     print(f"--- Random Search Parameter Tuning Initialized ---")
@@ -164,29 +445,21 @@ def random_search_parameters(num_trials, test_cases, base_params):
     best_params_overall = None
     min_avg_error_overall = float('inf')
 
-    for i in range(num_trials):
-        candidate_params = deepcopy(base_params) # Start with base, then override with random
-        print(f"Trial {i+1}/{num_trials}...")
-        current_trial_param_details = {}
-        for param_name, (min_val, max_val, param_type) in PARAMETER_RANGES.items():
-            if param_type == 'float':
-                random_value = random.uniform(min_val, max_val)
-            elif param_type == 'int':
-                random_value = random.randint(min_val, max_val)
-            else:
-                # Fallback for safety, though should not happen with defined ranges
-                random_value = base_params.get(param_name, min_val) 
-            candidate_params[param_name] = random_value
-            current_trial_param_details[param_name] = random_value
-        
-        # print(f"  Testing with: {current_trial_param_details}") # Optional: print params for each trial
-        average_error = evaluate_parameters(candidate_params, test_cases)
-        print(f"  Average Error: {average_error:.4f}")
+    trial_index = 0
+    while trial_index < num_trials:
+        batch_size = min(RANDOM_SEARCH_BATCH_SIZE, num_trials - trial_index)
+        candidate_batch = [sample_random_parameters(base_params) for _ in range(batch_size)]
+        batch_errors = evaluate_parameter_sets(candidate_batch, test_cases)
+
+        for candidate_params, average_error in zip(candidate_batch, batch_errors):
+            trial_index += 1
+            print(f"Trial {trial_index}/{num_trials}...")
+            print(f"  Average Error: {average_error:.4f}")
 
-        if average_error < min_avg_error_overall:
-            min_avg_error_overall = average_error
-            best_params_overall = deepcopy(candidate_params)
-            print(f"  ** New best error found: {min_avg_error_overall:.4f} **")
+            if average_error < min_avg_error_overall:
+                min_avg_error_overall = average_error
+                best_params_overall = deepcopy(candidate_params)
+                print(f"  ** New best error found: {min_avg_error_overall:.4f} **")
 
     print(f"\n--- Random Search Complete --- ")
     if best_params_overall:
@@ -213,12 +486,25 @@ def tune_single_parameter(param_name, test_values, test_cases, base_params):
     min_avg_error = float('inf')
     best_value_for_param = None
 
+    candidate_params_list = []
     for value in test_values:
-        print(f"Testing {param_name} = {value}...")
         current_params = deepcopy(base_params)
         current_params[param_name] = value
-        
-        average_error = evaluate_parameters(current_params, test_cases)
+        candidate_params_list.append(current_params)
+    if get_matrix_evaluator(test_cases) is not None:
+        # All values are scored in one broadcast pass
+        errors = evaluate_parameter_sets(candidate_params_list, test_cases)
+    else:
+        try:
+            # Only the components that read param_name are recomputed per value
+            evaluator = IncrementalEvaluator(test_cases, base_params)
+            errors = [evaluator.average_error(current_params) for current_params in candidate_params_list]
+        except (RuntimeError, ValueError) as e:
+            print(f"Incremental evaluation unavailable ({e}); evaluating every value in full.", file=sys.stderr)
+            errors = evaluate_parameter_sets(candidate_params_list, test_cases)
+
+    for value, average_error in zip(test_values, errors):
+        print(f"Testing {param_name} = {value}...")
         results[value] = average_error
         print(f"  Average Error: {average_error:.4f}")
 
@@ -239,9 +525,10 @@ def tune_single_parameter(param_name, test_values, test_cases, base_params):
 if __name__ == "__main__":
     # Load test cases first as it's common to all modes
     try:
-        with open(PUBLIC_CASES_JSON_PATH, 'r') as f:
-            all_test_cases = json.load(f)
-        print(f"Loaded {len(all_test_cases)} test cases from {PUBLIC_CASES_JSON_PATH}.")
+        # Memory-maps public_cases.bin instead when case_store.py has converted the JSON
+        all_test_cases = open_cases(PUBLIC_CASES_JSON_PATH)
+        loaded_from = all_test_cases.path if isinstance(all_test_cases, CaseStore) else PUBLIC_CASES_JSON_PATH
+        print(f"Loaded {len(all_test_cases)} test cases from {loaded_from}.")
     except FileNotFoundError:
         print(f"Error: Test cases file not found at {PUBLIC_CASES_JSON_PATH}")
         sys.exit(1)
@@ -266,6 +553,31 @@ if __name__ == "__main__":
         # random_search_parameters handles its own printing of results
         random_search_parameters(num_trials_for_random_search, all_test_cases, current_default_params)
     
+    elif len(sys.argv) > 1 and sys.argv[1].lower() == 'fit':
+        if len(sys.argv) not in (3, 4):
+            print("Usage for closed-form fitting: python tune_parameters.py fit <num_samples> [l1|l2]")
+            print("Example: python tune_parameters.py fit 500 l1")
+            sys.exit(1)
+        try:
+            num_fit_samples = int(sys.argv[2])
+            if num_fit_samples < 0:
+                raise ValueError("Number of samples must not be negative.")
+        except ValueError as e:
+            print(f"Error: Invalid number of samples. {e}")
+            sys.exit(1)
+        fit_objective = sys.argv[3].lower() if len(sys.argv) == 4 else 'l1'
+        try:
+            from fit_parameters import fit_search
+        except ImportError as e:
+            print(f"Error: Could not load the fit mode: {e}")
+            sys.exit(1)
+        try:
+            # fit_search handles its own printing of results
+            fit_search(num_fit_samples, all_test_cases, current_default_params, objective=fit_objective)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
     elif len(sys.argv) >= 3:
         parameter_name_to_tune = sys.argv[1]
         values_to_test_str = sys.argv[2:]
@@ -296,6 +608,7 @@ if __name__ == "__main__":
     else:
         print("\nUsage:")
         print("  For random search: python tune_parameters.py random <num_trials>")
+        print("  For closed-form fitting (NumPy): python tune_parameters.py fit <num_samples> [l1|l2]")
         print("  For single parameter tuning: python tune_parameters.py <parameter_name> <value1> <value2> ...")
         print("\nAvailable parameters for single tuning (from DEFAULT_PARAMS):")
         for p_name in DEFAULT_PARAMS.keys():